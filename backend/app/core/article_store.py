@@ -0,0 +1,119 @@
+import hashlib
+
+from app.core.cache import PREFIX, r, encode, decode
+
+# Persistent per-symbol article store:
+#   {PREFIX}:articles:{SYMBOL}:index  zset  article id -> unix datetime
+#   {PREFIX}:articles:{SYMBOL}:data   hash  article id -> encoded article
+#   {PREFIX}:articles:{SYMBOL}:meta   hash  covered_from (ISO date), synced_at (unix seconds)
+RETENTION_DAYS = 90          # articles older than this are trimmed on sync
+IDLE_TTL = 86400 * 30        # a symbol nobody asked about for this long is dropped entirely
+
+
+def _keys(symbol: str) -> tuple[str, str, str]:
+    base = f"{PREFIX}:articles:{symbol}"
+    return f"{base}:index", f"{base}:data", f"{base}:meta"
+
+
+def article_id(article: dict) -> str:
+    """Provider id when present, else a hash of the URL (or headline)."""
+    if article.get("id") is not None:
+        return str(article["id"])
+    basis = article.get("url") or article.get("headline") or ""
+    return hashlib.md5(basis.encode()).hexdigest()
+
+
+async def get_states(symbols: list[str]) -> list[dict | None]:
+    """Sync metadata per symbol ({'covered_from': str, 'synced_at': float}); None when never synced."""
+    pipe = r.pipeline(transaction=False)
+    for symbol in symbols:
+        pipe.hgetall(_keys(symbol)[2])
+    states = []
+    for raw in await pipe.execute():
+        if not raw:
+            states.append(None)
+            continue
+        states.append({
+            "covered_from": raw[b"covered_from"].decode(),
+            "synced_at": float(raw[b"synced_at"]),
+        })
+    return states
+
+
+async def add_articles(symbol: str, articles: list[dict], covered_from: str, synced_at: float,
+                       trim_before: float) -> int:
+    """
+    Upsert `articles` (deduplicated by id), record the sync and trim anything older
+    than `trim_before`. Returns how many articles were new.
+    """
+    index_key, data_key, meta_key = _keys(symbol)
+    docs = {article_id(a): a for a in articles if isinstance(a, dict) and a.get("datetime")}
+
+    pipe = r.pipeline(transaction=False)
+    if docs:
+        pipe.zadd(index_key, {doc_id: a["datetime"] for doc_id, a in docs.items()})
+        pipe.hset(data_key, mapping={doc_id: encode(a) for doc_id, a in docs.items()})
+    pipe.zrangebyscore(index_key, "-inf", f"({trim_before}")
+    pipe.zremrangebyscore(index_key, "-inf", f"({trim_before}")
+    pipe.hset(meta_key, mapping={"covered_from": covered_from, "synced_at": synced_at})
+    for key in (index_key, data_key, meta_key):
+        pipe.expire(key, IDLE_TTL)
+    results = await pipe.execute()
+
+    added = results[0] if docs else 0
+    expired = results[2 if docs else 0]
+    if expired:
+        await r.hdel(data_key, *expired)
+    return added
+
+
+async def query_many(symbols: list[str], since: float, limit: int | None = None,
+                     until: float | str = "+inf") -> dict[str, list[dict]]:
+    """
+    symbol -> articles with since <= datetime <= until, newest first (at most `limit` each).
+    Two pipelined round trips regardless of the number of symbols.
+    """
+    pipe = r.pipeline(transaction=False)
+    for symbol in symbols:
+        if limit:
+            pipe.zrevrangebyscore(_keys(symbol)[0], until, since, start=0, num=limit)
+        else:
+            pipe.zrevrangebyscore(_keys(symbol)[0], until, since)
+    ids_per_symbol = await pipe.execute()
+
+    pipe = r.pipeline(transaction=False)
+    for symbol, ids in zip(symbols, ids_per_symbol):
+        if ids:
+            pipe.hmget(_keys(symbol)[1], ids)
+    docs = iter(await pipe.execute())
+
+    return {
+        symbol: [a for a in (decode(raw) for raw in next(docs)) if a is not None] if ids else []
+        for symbol, ids in zip(symbols, ids_per_symbol)
+    }
+
+
+async def read_pages(pages: list[tuple[str, float | str, float, int, int]]) -> list[list[tuple[str, float, dict]]]:
+    """
+    Reads one page per (symbol, until, since, offset, num) request, newest first,
+    as [(article id, datetime, article), ...]. All pages share two pipelined round trips.
+    """
+    pipe = r.pipeline(transaction=False)
+    for symbol, until, since, offset, num in pages:
+        pipe.zrevrangebyscore(_keys(symbol)[0], until, since, start=offset, num=num, withscores=True)
+    entries_per_page = await pipe.execute()
+
+    pipe = r.pipeline(transaction=False)
+    for (symbol, *_), entries in zip(pages, entries_per_page):
+        if entries:
+            pipe.hmget(_keys(symbol)[1], [doc_id for doc_id, _ in entries])
+    docs = iter(await pipe.execute())
+
+    result = []
+    for entries in entries_per_page:
+        page = []
+        if entries:
+            for (doc_id, score), raw in zip(entries, next(docs)):
+                page.append((doc_id.decode(), score, decode(raw)))
+        result.append(page)
+    return result
@@ -1,8 +1,21 @@
-import redis
-import json
+import asyncio
+import redis.asyncio as redis
+import orjson
+import os
+import time
+import uuid
+from collections import Counter
 from app.core.config import settings
+from app.core.lru import LRUCache
+from app.utils.concurrency_util import spawn
 
-r = redis.Redis(host="localhost", port=6379, db=0, decode_responses=True)
+try:
+    import zstandard
+except ImportError:  # compression is optional
+    zstandard = None
+
+# Binary mode: values are compact orjson (optionally zstd) blobs, not pretty JSON text
+r = redis.Redis(host="localhost", port=6379, db=0)
 PREFIX = "marketly"
 
 TTL_PRESETS = {
@@ -10,8 +23,111 @@ TTL_PRESETS = {
     "stocks": 86400,        # 1 day
     "news": 3600 * 3,       # 3 hours
     "analyst": 86400 * 2,   # 2 days
+    "scores": 86400,        # 1 day (overridden by settings.GPT_SCORE_TTL)
+    "prices": 300,          # 5 minutes
+    "analytics": 3600 * 4,  # 4 hours (daily bars only move once a day)
 }
 
+# --- Stale-while-revalidate ---
+# TTL_PRESETS are soft TTLs: past them an entry is stale but still served while a
+# background task refreshes it. Entries are only evicted after STALE_FACTOR × soft TTL.
+STALE_FACTOR = 2
+HITS_TTL = 86400 * 7  # access counters expire after a week without reads
+ACCESS_FLUSH_EVERY = 100  # L1 hits buffered before their counters are flushed to Redis
+
+# --- Single-flight (get-or-compute) ---
+LOCK_TTL = 60       # seconds a cross-worker recompute lock lives before it auto-expires
+LOCK_WAIT = 30      # max seconds a waiting worker polls for the leader's result
+LOCK_POLL = 0.1     # seconds between polls
+
+# --- L1 (in-process) cache in front of Redis ---
+# Holds encoded blobs (every hit decodes a private copy) and only while the entry is
+# fresh, so stale entries always go through Redis and get revalidated.
+L1_MAX_ITEMS = 512
+L1_TTL = 30         # seconds; pub/sub invalidation usually evicts sooner
+INVALIDATION_CHANNEL = f"{PREFIX}:invalidate"
+INSTANCE_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+# --- Serialization ---
+ZSTD_MIN_SIZE = 1024  # bytes; smaller blobs are stored uncompressed
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Delete the lock only if we still own it (it may have expired and been re-taken)
+_release_lock = r.register_script(
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('del', KEYS[1]) else return 0 end"
+)
+
+# In-process flights: key -> compute Task shared by every request waiting on that key
+_flights: dict[str, asyncio.Task] = {}
+
+_l1 = LRUCache(max_items=L1_MAX_ITEMS, ttl=L1_TTL)
+_pending_access: Counter = Counter()
+_listener: asyncio.Task | None = None
+
+
+def encode(value) -> bytes:
+    """orjson, zstd-compressed when large and zstandard is installed."""
+    raw = orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    if zstandard is not None and len(raw) >= ZSTD_MIN_SIZE:
+        return zstandard.ZstdCompressor(level=3).compress(raw)
+    return raw
+
+
+def decode(raw: bytes | None):
+    """Inverse of encode(); also reads legacy plain-JSON entries. None on miss/corruption."""
+    if not raw:
+        return None
+    try:
+        if raw[:4] == ZSTD_MAGIC:
+            if zstandard is None:
+                return None
+            raw = zstandard.ZstdDecompressor().decompress(raw)
+        return orjson.loads(raw)
+    except Exception:
+        return None
+
+
+async def _listen_invalidations():
+    """Evict keys written or deleted by other workers from this worker's L1."""
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(INVALIDATION_CHANNEL)
+    try:
+        async for message in pubsub.listen():
+            origin, _, key = message["data"].decode().partition(" ")
+            if origin != INSTANCE_ID:
+                _l1.delete(key)
+    finally:
+        await pubsub.aclose()
+
+
+def _end_flight(key: str, flight: asyncio.Task):
+    _flights.pop(key, None)
+    if not flight.cancelled():
+        flight.exception()  # mark retrieved: waiters (if any) still receive it
+
+
+def _l1_get(key: str):
+    return decode(_l1.get(key))
+
+
+def _l1_put(key: str, raw: bytes, fresh_until: float | bytes | None):
+    """Keep `raw` in L1 until the entry goes stale (at most L1_TTL); fresh_until is epoch seconds."""
+    remaining = float(fresh_until or 0) - time.time()
+    if remaining > 0:
+        _l1.set(key, raw, ttl=min(L1_TTL, remaining))
+
+
+def start_invalidation_listener():
+    """Subscribe this worker to cross-worker L1 invalidations."""
+    global _listener
+    _listener = asyncio.create_task(_listen_invalidations())
+
+
+def stop_invalidation_listener():
+    if _listener is not None:
+        _listener.cancel()
+
 
 class CacheManager:
     @staticmethod
@@ -19,18 +135,256 @@ class CacheManager:
         return f"{PREFIX}:{namespace}:{identifier}"
 
     @staticmethod
-    def get(key: str):
-        value = r.get(key)
-        return value if value else None
+    def split_key(key: str) -> tuple[str | None, str]:
+        """'marketly:stocks:AAPL' -> ('stocks', 'AAPL')"""
+        parts = key.split(":", 2)
+        if len(parts) < 3:
+            return None, key
+        return parts[1], parts[2]
 
     @staticmethod
-    def set(key: str, value: str, ttl: int | None = None):
+    async def get(key: str):
+        """Decoded value from L1, else Redis; None on a miss."""
+        value = _l1_get(key)
+        if value is None:
+            raw, fresh_until = await r.mget([key, f"{key}:fresh"])
+            value = decode(raw)
+            if value is not None:
+                _l1_put(key, raw, fresh_until)
+        return value
+
+    @staticmethod
+    async def get_many(keys: list[str], refresh=None) -> list:
+        """
+        Bulk get: L1 first, then one MGET for the rest (values and their fresh
+        markers together); missing keys come back as None.
+        Stale values are still returned; when `refresh` is given it is awaited in the
+        background with the stale keys and must recompute and store them.
+        """
+        values = [_l1_get(key) for key in keys]
+        missing = [i for i, v in enumerate(values) if v is None]
+        if not missing:
+            return values
+
+        stale = []
+        raws = await r.mget([keys[i] for i in missing] + [f"{keys[i]}:fresh" for i in missing])
+        for i, raw, fresh in zip(missing, raws, raws[len(missing):]):
+            values[i] = decode(raw)
+            if values[i] is None:
+                continue
+            if fresh:
+                _l1_put(keys[i], raw, fresh)
+            else:
+                stale.append(keys[i])
+        if stale and refresh is not None:
+            spawn(CacheManager._refresh_many(stale, refresh))
+        return values
+
+    @staticmethod
+    async def set(key: str, value, ttl: int | None = None):
+        """Store `value` fresh for `ttl` (soft TTL) and keep it as stale for STALE_FACTOR × ttl."""
         # Determine namespace from key
-        namespace = key.split(":")[1] if ":" in key else None
+        namespace, _ = CacheManager.split_key(key)
         ttl = ttl or TTL_PRESETS.get(namespace, 3600)  # default 1 h fallback
-        r.set(key, value, ex=ttl)
+        raw, fresh_until = encode(value), time.time() + ttl
+        pipe = r.pipeline(transaction=False)
+        pipe.set(key, raw, ex=ttl * STALE_FACTOR)
+        pipe.set(f"{key}:fresh", fresh_until, ex=ttl)  # marker value: when the entry goes stale
+        pipe.publish(INVALIDATION_CHANNEL, f"{INSTANCE_ID} {key}")
+        await pipe.execute()
+        _l1_put(key, raw, fresh_until)
+
+    @staticmethod
+    async def set_many(values: dict, ttl: int | None = None):
+        """Bulk set(): every key -> value in one pipeline (TTL from the first key's namespace)."""
+        if not values:
+            return
+        namespace, _ = CacheManager.split_key(next(iter(values)))
+        ttl = ttl or TTL_PRESETS.get(namespace, 3600)
+        blobs, fresh_until = {key: encode(value) for key, value in values.items()}, time.time() + ttl
+        pipe = r.pipeline(transaction=False)
+        for key, raw in blobs.items():
+            pipe.set(key, raw, ex=ttl * STALE_FACTOR)
+            pipe.set(f"{key}:fresh", fresh_until, ex=ttl)
+            pipe.publish(INVALIDATION_CHANNEL, f"{INSTANCE_ID} {key}")
+        await pipe.execute()
+        for key, raw in blobs.items():
+            _l1_put(key, raw, fresh_until)
 
     @staticmethod
-    def delete(pattern: str):
-        for key in r.scan_iter(f"{PREFIX}:{pattern}*"):
-            r.delete(key)
+    async def fresh_ttl(key: str) -> int:
+        """Seconds until `key` goes stale (<= 0 when already stale or missing)."""
+        return max(await r.ttl(f"{key}:fresh"), 0)
+
+    @staticmethod
+    async def record_access(keys: list[str]):
+        """Bump per-namespace access counters (drives the cache warmer)."""
+        pipe = r.pipeline(transaction=False)
+        for key in keys:
+            CacheManager._queue_access(pipe, key)
+        await pipe.execute()
+
+    @staticmethod
+    def _note_access(key: str):
+        """Buffer an L1 hit; counters are flushed to Redis in batches."""
+        _pending_access[key] += 1
+        if sum(_pending_access.values()) < ACCESS_FLUSH_EVERY:
+            return
+        pending = dict(_pending_access)
+        _pending_access.clear()
+
+        async def flush():
+            pipe = r.pipeline(transaction=False)
+            for k, n in pending.items():
+                CacheManager._queue_access(pipe, k, n)
+            await pipe.execute()
+
+        spawn(flush())
+
+    @staticmethod
+    def _queue_access(pipe, key: str, count: int = 1):
+        namespace, identifier = CacheManager.split_key(key)
+        if namespace:
+            pipe.zincrby(f"{PREFIX}:hits:{namespace}", count, identifier)
+            pipe.expire(f"{PREFIX}:hits:{namespace}", HITS_TTL)
+
+    @staticmethod
+    async def top_accessed(namespace: str, limit: int) -> list[str]:
+        """Most-read identifiers in `namespace`, most popular first."""
+        return [m.decode() for m in await r.zrevrange(f"{PREFIX}:hits:{namespace}", 0, limit - 1)]
+
+    @staticmethod
+    async def decay_access(namespace: str, factor: float = 0.8):
+        """Scale access counters down so old popularity fades."""
+        hits_key = f"{PREFIX}:hits:{namespace}"
+        await r.zunionstore(hits_key, {hits_key: factor})
+
+    @staticmethod
+    async def incr_metric(name: str, field: str, amount: int = 1):
+        """Increment a counter in the `marketly:metrics:{name}` hash."""
+        await r.hincrby(f"{PREFIX}:metrics:{name}", field, amount)
+
+    @staticmethod
+    async def get_metrics(name: str) -> dict:
+        """All counters of one metrics hash, e.g. {'hits': 12, 'misses': 3}."""
+        raw = await r.hgetall(f"{PREFIX}:metrics:{name}")
+        return {k.decode(): int(v) for k, v in raw.items()}
+
+    @staticmethod
+    async def delete(pattern: str):
+        async for key in r.scan_iter(f"{PREFIX}:{pattern}*"):
+            key = key.decode()
+            await r.delete(key)
+            await r.publish(INVALIDATION_CHANNEL, f"{INSTANCE_ID} {key}")
+            _l1.delete(key)
+
+    @staticmethod
+    async def get_or_compute(key: str, compute, ttl: int | None = None, force_refresh: bool = False):
+        """
+        Return the cached value for `key`, or await `compute()` and cache its result.
+        Concurrent misses are coalesced (single-flight): requests in this process share one
+        in-flight call, and workers in other processes wait on a Redis lock for the leader's
+        result instead of recomputing it.
+        Stale entries (past their soft TTL) are returned immediately and refreshed in
+        the background.
+        """
+        if not force_refresh:
+            value = _l1_get(key)
+            if value is not None:
+                CacheManager._note_access(key)
+                return value
+
+            pipe = r.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.get(f"{key}:fresh")
+            CacheManager._queue_access(pipe, key)
+            cached, fresh = (await pipe.execute())[:2]
+            value = decode(cached)
+            if value is not None:
+                if fresh:
+                    _l1_put(key, cached, fresh)
+                else:
+                    spawn(CacheManager._refresh(key, compute, ttl))
+                return value
+
+        flight = _flights.get(key)
+        if flight is None:
+            # The compute runs as its own task: a caller that is cancelled (disconnect,
+            # deadline) only stops waiting, the flight keeps going and caches its result.
+            flight = _flights[key] = asyncio.create_task(
+                CacheManager._compute_locked(key, compute, ttl, force_refresh)
+            )
+            flight.add_done_callback(lambda f: _end_flight(key, f))
+        return await asyncio.shield(flight)
+
+    @staticmethod
+    async def _refresh(key: str, compute, ttl: int | None):
+        """Background revalidation; skipped if another request or worker is already on it."""
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        if not await r.set(lock_key, token, nx=True, ex=LOCK_TTL):
+            return
+        try:
+            print(f"♻️  Revalidating stale {key}")
+            await CacheManager.set(key, await compute(), ttl)
+        except Exception as e:
+            print(f"⚠️  Background refresh of {key} failed: {e}")
+        finally:
+            await _release_lock(keys=[lock_key], args=[token])
+
+    @staticmethod
+    async def _refresh_many(keys: list[str], refresh):
+        """Batch revalidation of stale keys; keys another request or worker is refreshing are skipped."""
+        token = uuid.uuid4().hex
+        pipe = r.pipeline(transaction=False)
+        for key in keys:
+            pipe.set(f"{key}:lock", token, nx=True, ex=LOCK_TTL)
+        locked = [key for key, ok in zip(keys, await pipe.execute()) if ok]
+        if not locked:
+            return
+        try:
+            print(f"♻️  Revalidating {len(locked)} stale keys")
+            await refresh(locked)
+        except Exception as e:
+            print(f"⚠️  Background refresh of {len(locked)} keys failed: {e}")
+        finally:
+            for key in locked:
+                await _release_lock(keys=[f"{key}:lock"], args=[token])
+
+    @staticmethod
+    async def _compute_locked(key: str, compute, ttl: int | None, force_refresh: bool):
+        """Recompute `key` while holding its cross-worker lock, or wait for whoever holds it."""
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+
+        if await r.set(lock_key, token, nx=True, ex=LOCK_TTL):
+            try:
+                # Another worker may have filled the key between our miss and the lock
+                if not force_refresh:
+                    cached = decode(await r.get(key))
+                    if cached is not None:
+                        return cached
+                value = await compute()
+                await CacheManager.set(key, value, ttl)
+                return value
+            finally:
+                await _release_lock(keys=[lock_key], args=[token])
+
+        # Someone else is recomputing: wait for the lock to go away, then read their result
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL)
+            locked = await r.exists(lock_key)
+            if locked and force_refresh:
+                continue  # the old value is still there; wait for the new one
+            cached = decode(await r.get(key))
+            if cached is not None:
+                return cached
+            if not locked:
+                break
+
+        # Leader failed or timed out — compute ourselves
+        print(f"⚠️  Single-flight wait for {key} gave up, computing locally")
+        value = await compute()
+        await CacheManager.set(key, value, ttl)
+        return value
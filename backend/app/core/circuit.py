@@ -0,0 +1,146 @@
+import threading
+import time
+
+# Breaker tuning (per worker process; state is cheap to rebuild after a restart)
+EWMA_ALPHA = 0.2          # weight of the newest call in the moving averages
+FAILURE_THRESHOLD = 0.5   # open when the EWMA error rate reaches this...
+MIN_CALLS = 5             # ...after at least this many calls
+OPEN_SECONDS = 30         # how long an open breaker rejects calls before probing
+SLOW_CALL_SECONDS = 3.0   # EWMA latency above this marks a provider as slow
+LATENCY_BUCKET = 0.5      # providers within this many seconds of each other count as equally fast
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The provider's breaker is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker with EWMA latency and error rate.
+    Open breakers reject calls for OPEN_SECONDS, then let a single probe through:
+    a successful probe closes the breaker, a failed one re-opens it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.calls = 0
+        self.error_rate = 0.0
+        self.latency = None
+        self.opened_at = 0.0
+        self.last_call = 0.0
+        self.probe_started = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and now - self.opened_at < OPEN_SECONDS:
+                return False
+            # half-open: one probe at a time (a probe that never reported back expires)
+            if self.probe_started is not None and now - self.probe_started < OPEN_SECONDS:
+                return False
+            self.state = HALF_OPEN
+            self.probe_started = now
+            return True
+
+    def release_probe(self):
+        """Hands back a half-open probe that allow() granted but that was never sent."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probe_started = None
+
+    def record(self, ok: bool, elapsed: float):
+        with self._lock:
+            self.calls += 1
+            self.last_call = time.monotonic()
+            self.latency = elapsed if self.latency is None else (
+                EWMA_ALPHA * elapsed + (1 - EWMA_ALPHA) * self.latency
+            )
+            self.error_rate = EWMA_ALPHA * (0.0 if ok else 1.0) + (1 - EWMA_ALPHA) * self.error_rate
+
+            if self.state == HALF_OPEN:
+                self.probe_started = None
+                if ok:
+                    self.state, self.error_rate = CLOSED, 0.0
+                    print(f"🟢 {self.name} circuit closed")
+                else:
+                    self._open()
+            elif self.state == CLOSED and self.calls >= MIN_CALLS and self.error_rate >= FAILURE_THRESHOLD:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        print(f"🔴 {self.name} circuit open for {OPEN_SECONDS}s (error rate {self.error_rate:.0%})")
+
+    @property
+    def is_slow(self) -> bool:
+        """Slow EWMA latency; expires after OPEN_SECONDS without calls so a skipped provider gets re-tried."""
+        return (
+            self.latency is not None
+            and self.latency > SLOW_CALL_SECONDS
+            and time.monotonic() - self.last_call < OPEN_SECONDS
+        )
+
+    @property
+    def is_available(self) -> bool:
+        """False while open and still cooling down (does not claim the half-open probe)."""
+        return not (self.state == OPEN and time.monotonic() - self.opened_at < OPEN_SECONDS)
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "error_rate": round(self.error_rate, 3),
+            "latency_ms": round(self.latency * 1000) if self.latency is not None else None,
+            "slow": self.is_slow,
+        }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        breaker = _breakers.setdefault(provider, CircuitBreaker(provider))
+    return breaker
+
+
+def rank_providers(providers: list[str]) -> list[str]:
+    """
+    Healthy providers first, fastest first; open ones are dropped, slow ones go last.
+    Ties (similar latency, or no data yet) keep the given order, so it doubles as the static preference.
+    """
+    def key(provider: str):
+        breaker = get_breaker(provider)
+        return breaker.is_slow, breaker.state != CLOSED, int((breaker.latency or 0.0) // LATENCY_BUCKET)
+
+    return sorted((p for p in providers if get_breaker(p).is_available), key=key)
+
+
+async def guarded(provider: str, fn, *args):
+    """
+    Await fn(*args) under `provider`'s breaker (for calls that do not go through http_get).
+    Raises CircuitOpenError without calling when the breaker rejects it; cancellation counts as a failure.
+    """
+    breaker = get_breaker(provider)
+    if not breaker.allow():
+        raise CircuitOpenError(f"{provider} circuit is open")
+    started = time.monotonic()
+    try:
+        result = await fn(*args)
+    except BaseException:
+        breaker.record(False, time.monotonic() - started)
+        raise
+    breaker.record(True, time.monotonic() - started)
+    return result
+
+
+def breaker_states() -> dict:
+    return {name: breaker.snapshot() for name, breaker in sorted(_breakers.items())}
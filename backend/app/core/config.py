@@ -6,6 +6,13 @@ load_dotenv()
 
 class Settings:
     REDIS_URL = os.getenv("REDIS_URL")
+    OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5-nano-2025-08-07")
+    GPT_SCORE_TTL = int(os.getenv("GPT_SCORE_TTL", 86400))  # seconds a cached GPT score stays fresh
+    GPT_PROMPT_TOKEN_BUDGET = int(os.getenv("GPT_PROMPT_TOKEN_BUDGET", 4000))  # max tokens of scoring payload
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # None = api.openai.com
+    OPENAI_BATCH_BASE_URL = os.getenv("OPENAI_BATCH_BASE_URL")  # e.g. a local stub for tests
+    DATA_DIR = os.getenv("DATA_DIR", "data")  # local Parquet stores (FRED series, price history)
+    LIVE_FEED = os.getenv("LIVE_FEED", "finnhub")  # upstream of /ws/live: "finnhub" or "stub"
     # SUPABASE_URL = os.getenv("SUPABASE_URL")
     # SUPABASE_KEY = os.getenv("SUPABASE_KEY")
     # OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
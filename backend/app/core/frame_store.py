@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from app.core.config import settings
+
+# Columnar time-series store: one Parquet file per frame under settings.DATA_DIR,
+# e.g. "fred/GDPC1" -> {DATA_DIR}/fred/GDPC1.parquet. Frames are indexed by a
+# DatetimeIndex named "date"; writes are atomic (temp file + rename).
+_locks: dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _path(name: str) -> Path:
+    return Path(settings.DATA_DIR) / f"{name}.parquet"
+
+
+def _lock(name: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def read_frame(name: str) -> pd.DataFrame | None:
+    """The stored frame, or None when it was never written (blocking; run in a thread)."""
+    path = _path(name)
+    if not path.exists():
+        return None
+    return pd.read_parquet(path)
+
+
+def frame_age(name: str) -> float | None:
+    """Seconds since the frame was last written, None when it does not exist."""
+    path = _path(name)
+    return time.time() - path.stat().st_mtime if path.exists() else None
+
+
+def upsert_frame(name: str, new: pd.DataFrame) -> pd.DataFrame:
+    """
+    Merges `new` rows into the stored frame (rows with the same date are replaced
+    by the new ones), writes it back and returns the merged frame.
+    """
+    with _lock(name):
+        stored = read_frame(name)
+        if stored is not None and not stored.empty:
+            merged = pd.concat([stored[~stored.index.isin(new.index)], new])
+        else:
+            merged = new
+        return _write(name, merged)
+
+
+def replace_frame(name: str, frame: pd.DataFrame) -> pd.DataFrame:
+    """Overwrites the stored frame with `frame` (e.g. a full re-download) and returns it."""
+    with _lock(name):
+        return _write(name, frame)
+
+
+def _write(name: str, frame: pd.DataFrame) -> pd.DataFrame:
+    frame = frame.sort_index()
+    frame.index.name = "date"
+    path = _path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    frame.to_parquet(tmp)
+    os.replace(tmp, path)
+    return frame
+
+
+def touch_frame(name: str):
+    """Marks a frame as freshly synced without rewriting it (nothing new upstream)."""
+    path = _path(name)
+    if path.exists():
+        path.touch()
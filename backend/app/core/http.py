@@ -0,0 +1,120 @@
+import asyncio
+import random
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.circuit import CircuitOpenError, get_breaker
+from app.core.ratelimit import PROVIDER_BY_HOST, acquire, record_throttled
+
+# Shared timeouts for every upstream call
+TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+# Max open connections per upstream host (keep-alive pool is the same size)
+DEFAULT_HOST_LIMIT = 10
+HOST_LIMITS = {
+    "finnhub.io": 20,
+    "financialmodelingprep.com": 10,
+    "api.twelvedata.com": 8,
+    "yh-finance.p.rapidapi.com": 10,
+}
+
+# Retry-with-backoff
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.5  # seconds, doubled on each attempt
+MAX_BACKOFF = 10    # seconds; longer Retry-After values are clamped to this
+REQUEST_DEADLINE = 30  # seconds across all attempts; no retry is started past it
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def get_client(host: str) -> httpx.AsyncClient:
+    """Returns the pooled keep-alive HTTP/2 client for `host`, creating it on first use."""
+    client = _clients.get(host)
+    if client is None:
+        limit = HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT)
+        client = _clients[host] = httpx.AsyncClient(
+            http2=True,
+            timeout=TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=limit,
+                max_keepalive_connections=limit,
+                keepalive_expiry=60,
+            ),
+        )
+    return client
+
+
+def _backoff_delay(attempt: int, response: httpx.Response | None = None) -> float:
+    """Exponential backoff with jitter; honours a numeric Retry-After header, up to MAX_BACKOFF."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF)
+    return min(BACKOFF_BASE * (2 ** attempt) + random.uniform(0, BACKOFF_BASE), MAX_BACKOFF)
+
+
+async def http_get(url: str, params: dict | None = None, headers: dict | None = None,
+                   retries: int = MAX_RETRIES, deadline: float = REQUEST_DEADLINE) -> httpx.Response:
+    """
+    GET `url` through the shared per-host connection pool.
+    Every attempt is refused outright with CircuitOpenError while that provider's
+    circuit breaker is open, and otherwise takes a token from the host's provider
+    rate limiter (raises RateLimitExceeded if none frees up in time), so refused
+    calls never spend quota.
+    Transport errors and retryable statuses (429/5xx) are retried with backoff;
+    the last response is returned as-is, the last transport error is re-raised.
+    A retry whose backoff would end past `deadline` seconds is not attempted.
+    """
+    host = urlsplit(url).hostname or ""
+    client = get_client(host)
+    provider = PROVIDER_BY_HOST.get(host)
+    breaker = get_breaker(provider or host)
+    give_up_at = time.monotonic() + deadline
+
+    for attempt in range(retries + 1):
+        if not breaker.allow():
+            raise CircuitOpenError(f"{breaker.name} circuit is open")
+        try:
+            await acquire(provider)
+        except BaseException:
+            breaker.release_probe()
+            raise
+
+        started = time.monotonic()
+        try:
+            response = await client.get(url, params=params, headers=headers)
+        except httpx.TransportError:
+            breaker.record(False, time.monotonic() - started)
+            delay = _backoff_delay(attempt)
+            if attempt == retries or time.monotonic() + delay > give_up_at:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:  # cancelled by a caller's deadline: the provider was too slow
+            breaker.record(False, time.monotonic() - started)
+            raise
+        # 429 is our quota, not the provider's health
+        breaker.record(response.status_code < 500, time.monotonic() - started)
+
+        if response.status_code == 429:
+            print(f"🚦 {provider or host} throttled us (429), attempt {attempt + 1}")
+            await record_throttled(provider)
+        if response.status_code not in RETRY_STATUSES or attempt == retries:
+            return response
+        delay = _backoff_delay(attempt, response)
+        if time.monotonic() + delay > give_up_at:
+            print(f"⏱️  {provider or host}: retry in {delay:.1f}s would pass the {deadline}s deadline, giving up")
+            return response
+        await asyncio.sleep(delay)
+
+    return response
+
+
+async def close_clients():
+    """Closes every pooled client (called on app shutdown)."""
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
@@ -0,0 +1,262 @@
+import asyncio
+import time
+import uuid
+
+import orjson
+from fastapi import WebSocket
+
+from app.core.cache import PREFIX, r
+from app.core.config import settings
+from app.utils.concurrency_util import spawn
+
+# --- Live updates hub ---
+# One elected worker polls the upstream feed for every symbol that any client
+# watches and publishes changes on Redis pub/sub; every worker relays them to
+# its own WebSocket subscribers. N clients on a ticker cost one upstream feed.
+LIVE_POLL_INTERVAL = 15   # seconds between leader polls
+LIVE_LEADER_TTL = 45      # seconds leadership survives without a renewal (3 polls)
+LIVE_HEARTBEAT = 10       # seconds between a worker's "still watching" refreshes
+LIVE_MAX_SYMBOLS = 50     # per connection
+LIVE_SEND_TIMEOUT = 5     # a client that cannot take a message this fast is dropped
+LIVE_OUTBOX_SIZE = 256    # queued messages per connection; a client that falls this far behind is dropped
+
+LIVE_SYMBOLS_KEY = f"{PREFIX}:live:symbols"      # zset symbol -> watched-until (unix time)
+LIVE_LEADER_KEY = f"{PREFIX}:live:leader"
+LIVE_CHANNEL = f"{PREFIX}:live:updates"          # per symbol: {LIVE_CHANNEL}:{SYMBOL}
+LIVE_LAST_KEY = f"{PREFIX}:live:last"            # per symbol hash: event type -> last event
+
+# Keep leadership only while we still hold it
+_renew_leader = r.register_script(
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('expire', KEYS[1], ARGV[2]) else return 0 end"
+)
+
+# feed name -> (async fn(symbols) -> [{"type": ..., "symbol": ..., "data": ...}, ...],
+#              symbols polled per pass or None, max symbols watched across workers or None)
+_feeds = {}
+_subscribers: dict[str, set[WebSocket]] = {}
+# Per connection: bounded outbox drained by its own writer task, so one slow
+# client never delays messages to the others
+_outboxes: dict[WebSocket, tuple[asyncio.Queue, asyncio.Task]] = {}
+_tasks: list[asyncio.Task] = []
+_leader_token = uuid.uuid4().hex
+_last_sent: dict[tuple[str, str], bytes] = {}
+_polled_at: dict[str, float] = {}  # leader only: when each symbol was last polled
+
+
+def connect(websocket: WebSocket):
+    """Starts the outbox writer of an accepted connection; pair with disconnect()."""
+    outbox = asyncio.Queue(maxsize=LIVE_OUTBOX_SIZE)
+    _outboxes[websocket] = (outbox, asyncio.create_task(_write(websocket, outbox)))
+
+
+def disconnect(websocket: WebSocket):
+    """Drops every subscription of the connection and stops its writer."""
+    unsubscribe(websocket)
+    entry = _outboxes.pop(websocket, None)
+    if entry is not None:
+        entry[1].cancel()
+
+
+def send(websocket: WebSocket, message: dict | str) -> bool:
+    """
+    Queues a message (dict or JSON text) for the connection without waiting.
+    A connection whose outbox is full is too slow: it is dropped and closed.
+    """
+    entry = _outboxes.get(websocket)
+    if entry is None:
+        return False
+    try:
+        entry[0].put_nowait(message if isinstance(message, str) else orjson.dumps(message).decode())
+        return True
+    except asyncio.QueueFull:
+        print(f"🐢 Live client {LIVE_OUTBOX_SIZE} messages behind, dropping it")
+        _drop(websocket)
+        return False
+
+
+def _drop(websocket: WebSocket):
+    disconnect(websocket)
+
+    async def close():
+        try:
+            await websocket.close(code=1013)  # try again later
+        except Exception:
+            pass
+
+    spawn(close())
+
+
+async def _write(websocket: WebSocket, outbox: asyncio.Queue):
+    while True:
+        text = await outbox.get()
+        try:
+            await asyncio.wait_for(websocket.send_text(text), LIVE_SEND_TIMEOUT)
+        except Exception:
+            _drop(websocket)
+            return
+
+
+def register_feed(name: str, poll, batch_size: int | None = None, max_symbols: int | None = None):
+    """
+    Lets an integration provide an upstream feed; settings.LIVE_FEED picks one.
+    Quota-bound feeds set batch_size (symbols polled per pass, least recently
+    polled first) and max_symbols (distinct symbols watched across all workers).
+    """
+    _feeds[name] = (poll, batch_size, max_symbols)
+
+
+async def _capacity(symbols: list[str]) -> list[str]:
+    """The subset of `symbols` the feed can take: already watched ones plus new ones up to max_symbols."""
+    max_symbols = _feeds.get(settings.LIVE_FEED, (None, None, None))[2]
+    if max_symbols is None:
+        return symbols
+    now = time.time()
+    pipe = r.pipeline(transaction=False)
+    pipe.zcount(LIVE_SYMBOLS_KEY, now, "+inf")
+    for symbol in symbols:
+        pipe.zscore(LIVE_SYMBOLS_KEY, symbol)
+    watched, *scores = await pipe.execute()
+    free = max(max_symbols - watched, 0)
+    allowed = []
+    for symbol, until in zip(symbols, scores):
+        if until is not None and until >= now:
+            allowed.append(symbol)
+        elif free:
+            allowed.append(symbol)
+            free -= 1
+    return allowed
+
+
+async def subscribe(websocket: WebSocket, symbols: list[str]) -> list[str]:
+    """
+    Adds `symbols` to this connection's watch list (capped at LIVE_MAX_SYMBOLS, and
+    at the feed's max_symbols across all workers) and sends the latest known event
+    for each right away. Returns the accepted symbols.
+    """
+    watching = [s for s, sockets in _subscribers.items() if websocket in sockets]
+    accepted = [s for s in symbols if s not in watching][:max(LIVE_MAX_SYMBOLS - len(watching), 0)]
+    accepted = await _capacity(accepted) if accepted else []
+    if not accepted:
+        return []
+
+    for symbol in accepted:
+        _subscribers.setdefault(symbol, set()).add(websocket)
+    await _mark_watched(accepted)
+
+    pipe = r.pipeline(transaction=False)
+    for symbol in accepted:
+        pipe.hvals(f"{LIVE_LAST_KEY}:{symbol}")
+    for events in await pipe.execute():
+        for raw in events:
+            send(websocket, raw.decode())
+    return accepted
+
+
+def unsubscribe(websocket: WebSocket, symbols: list[str] | None = None):
+    """Removes `symbols` (default: all) from this connection's watch list."""
+    for symbol in list(symbols if symbols is not None else _subscribers):
+        sockets = _subscribers.get(symbol)
+        if sockets is None:
+            continue
+        sockets.discard(websocket)
+        if not sockets:
+            del _subscribers[symbol]
+
+
+async def _mark_watched(symbols: list[str]):
+    if symbols:
+        until = time.time() + 3 * LIVE_HEARTBEAT
+        await r.zadd(LIVE_SYMBOLS_KEY, {s: until for s in symbols})
+
+
+async def _heartbeat():
+    """Keeps this worker's watched symbols alive in the shared set."""
+    while True:
+        try:
+            await _mark_watched(list(_subscribers))
+        except Exception as e:
+            print(f"⚠️  Live heartbeat failed: {e}")
+        await asyncio.sleep(LIVE_HEARTBEAT)
+
+
+async def _relay():
+    """Forwards published updates to this worker's subscribers of that symbol."""
+    pubsub = r.pubsub()
+    await pubsub.psubscribe(f"{LIVE_CHANNEL}:*")
+    try:
+        async for message in pubsub.listen():
+            if message.get("type") != "pmessage":
+                continue
+            symbol = message["channel"].decode().rsplit(":", 1)[-1]
+            text = message["data"].decode()
+            for ws in list(_subscribers.get(symbol, ())):
+                send(ws, text)
+    finally:
+        await pubsub.aclose()
+
+
+async def publish_events(events: list[dict]) -> int:
+    """Publishes events whose data changed since the last poll. Returns how many were sent."""
+    pipe = r.pipeline(transaction=False)
+    sent = 0
+    for event in events:
+        raw = orjson.dumps(event)
+        fingerprint = orjson.dumps(event["data"], option=orjson.OPT_SORT_KEYS)
+        if _last_sent.get((event["symbol"], event["type"])) == fingerprint:
+            continue
+        _last_sent[(event["symbol"], event["type"])] = fingerprint
+        pipe.publish(f"{LIVE_CHANNEL}:{event['symbol']}", raw)
+        pipe.hset(f"{LIVE_LAST_KEY}:{event['symbol']}", event["type"], raw)
+        pipe.expire(f"{LIVE_LAST_KEY}:{event['symbol']}", 86400)
+        sent += 1
+    if sent:
+        await pipe.execute()
+    return sent
+
+
+async def poll_once() -> int:
+    """
+    One leader pass: poll the configured feed for every watched symbol and
+    publish what changed. Returns the number of events published (0 when not leader).
+    """
+    if not await r.set(LIVE_LEADER_KEY, _leader_token, nx=True, ex=LIVE_LEADER_TTL):
+        if not await _renew_leader(keys=[LIVE_LEADER_KEY], args=[_leader_token, LIVE_LEADER_TTL]):
+            _last_sent.clear()  # someone else leads; start fresh if we take over later
+            _polled_at.clear()
+            return 0
+
+    now = time.time()
+    await r.zremrangebyscore(LIVE_SYMBOLS_KEY, "-inf", now)
+    symbols = [s.decode() for s in await r.zrangebyscore(LIVE_SYMBOLS_KEY, now, "+inf")]
+    if not symbols:
+        return 0
+
+    feed = _feeds.get(settings.LIVE_FEED)
+    if feed is None:
+        print(f"⚠️  Unknown LIVE_FEED {settings.LIVE_FEED!r}; expected one of {sorted(_feeds)}")
+        return 0
+    poll, batch_size, _ = feed
+    if batch_size is not None:
+        symbols = sorted(symbols, key=lambda s: _polled_at.get(s, 0.0))[:batch_size]
+        _polled_at.update({s: now for s in symbols})
+    return await publish_events(await poll(symbols))
+
+
+async def _lead():
+    while True:
+        try:
+            await poll_once()
+        except Exception as e:
+            print(f"⚠️  Live poll failed: {e}")
+        await asyncio.sleep(LIVE_POLL_INTERVAL)
+
+
+def start_live():
+    _tasks.extend(asyncio.create_task(loop()) for loop in (_heartbeat, _relay, _lead))
+
+
+def stop_live():
+    for task in _tasks:
+        task.cancel()
+    _tasks.clear()
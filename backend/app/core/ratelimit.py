@@ -0,0 +1,137 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from app.core.cache import PREFIX, r
+
+# provider: (bucket capacity, refill tokens/second, daily quota or 0 for none)
+# Shared by every worker through Redis; tune to the plan each API key is on.
+PROVIDER_LIMITS = {
+    "finnhub": (30, 1.0, 0),              # 60 calls/min
+    "fmp": (5, 5.0, 250),                 # 250 calls/day
+    "twelvedata": (8, 8 / 60, 800),       # 8 calls/min, 800/day
+    "rapidapi": (10, 5.0, 0),
+    "fred": (60, 2.0, 0),                 # 120 calls/min
+    "eventregistry": (10, 1.0, 0),
+}
+
+PROVIDER_BY_HOST = {
+    "finnhub.io": "finnhub",
+    "financialmodelingprep.com": "fmp",
+    "api.twelvedata.com": "twelvedata",
+    "yh-finance.p.rapidapi.com": "rapidapi",
+}
+
+QUEUE_DEADLINE = 5  # default seconds a caller may wait for a token
+
+# Token bucket + daily counter, evaluated atomically on the Redis clock.
+# Returns {status, tokens_left, wait_seconds}: status 1 = granted, 0 = wait, -1 = daily quota spent.
+_take_token = r.register_script("""
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local daily_limit = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+if daily_limit > 0 then
+  local used = tonumber(redis.call('GET', KEYS[2]) or '0')
+  if used + cost > daily_limit then
+    return {-1, '0', '0'}
+  end
+end
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local status = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  status = 1
+  if daily_limit > 0 then
+    redis.call('INCRBY', KEYS[2], cost)
+    redis.call('EXPIRE', KEYS[2], 90000)
+  end
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+
+local wait = 0
+if status == 0 then wait = (cost - tokens) / rate end
+return {status, tostring(tokens), tostring(wait)}
+""")
+
+
+class RateLimitExceeded(Exception):
+    """No token became available before the caller's deadline (or the daily quota is spent)."""
+
+
+def _bucket_key(provider: str) -> str:
+    return f"{PREFIX}:ratelimit:{provider}"
+
+
+def _day_key(provider: str) -> str:
+    return f"{PREFIX}:quota:{provider}:{datetime.now(timezone.utc):%Y%m%d}"
+
+
+async def acquire(provider: str | None, cost: int = 1, deadline: float = QUEUE_DEADLINE):
+    """
+    Take `cost` tokens from `provider`'s shared bucket, queueing up to `deadline`
+    seconds. Raises RateLimitExceeded when the wait would exceed the deadline or
+    the provider's daily quota is used up. Unknown providers are not limited.
+    """
+    if provider not in PROVIDER_LIMITS:
+        return
+    capacity, rate, daily = PROVIDER_LIMITS[provider]
+    give_up_at = time.monotonic() + deadline
+
+    while True:
+        status, _, wait = await _take_token(
+            keys=[_bucket_key(provider), _day_key(provider)], args=[capacity, rate, cost, daily]
+        )
+        if int(status) == 1:
+            return
+        if int(status) == -1:
+            await r.hincrby(f"{PREFIX}:metrics:ratelimit", f"{provider}_quota_spent", 1)
+            raise RateLimitExceeded(f"{provider} daily quota of {daily} calls is used up")
+
+        wait = float(wait)
+        if time.monotonic() + wait > give_up_at:
+            await r.hincrby(f"{PREFIX}:metrics:ratelimit", f"{provider}_timeouts", 1)
+            raise RateLimitExceeded(f"{provider} rate limit: no token within {deadline}s")
+        await asyncio.sleep(wait)
+
+
+async def record_throttled(provider: str | None):
+    """Count an upstream 429 so bursts show up in /metrics/quota."""
+    if provider:
+        await r.hincrby(f"{PREFIX}:metrics:ratelimit", f"{provider}_429", 1)
+
+
+async def quota_status() -> dict:
+    """Per-provider remaining burst tokens, daily usage and limiter counters."""
+    status = {}
+    for provider, (capacity, rate, daily) in PROVIDER_LIMITS.items():
+        tokens, ts = await r.hmget(_bucket_key(provider), "tokens", "ts")
+        if tokens is None:
+            remaining = capacity
+        else:
+            remaining = min(capacity, float(tokens) + max(0.0, time.time() - float(ts)) * rate)
+        used_today = int(await r.get(_day_key(provider)) or 0)
+        status[provider] = {
+            "tokens_remaining": round(remaining, 2),
+            "capacity": capacity,
+            "per_minute": round(rate * 60, 2),
+            "daily_limit": daily or None,
+            "used_today": used_today,
+            "remaining_today": daily - used_today if daily else None,
+        }
+
+    counters = await r.hgetall(f"{PREFIX}:metrics:ratelimit")
+    for field, value in counters.items():
+        provider, _, counter = field.decode().partition("_")
+        if provider in status:
+            status[provider][counter] = int(value)
+    return status
@@ -0,0 +1,62 @@
+import asyncio
+import uuid
+
+from app.core.cache import CacheManager, PREFIX, r
+
+# --- Scheduled cache warmer ---
+WARM_INTERVAL = 600     # seconds between passes
+WARM_TOP_N = 50         # most-requested identifiers warmed per namespace
+WARM_LOCK_KEY = f"{PREFIX}:warmer:lock"
+
+# namespace -> async fn(identifier) that force-refreshes that cache entry
+_refreshers = {}
+_task: asyncio.Task | None = None
+
+
+def register_refresher(namespace: str, refresh):
+    """Lets an integration declare how to re-fetch one of its cache entries."""
+    _refreshers[namespace] = refresh
+
+
+async def warm_once():
+    """
+    Re-fetch the most-requested entries of every registered namespace that would
+    go stale before the next pass. Only one worker runs a pass at a time.
+    """
+    token = uuid.uuid4().hex
+    if not await r.set(WARM_LOCK_KEY, token, nx=True, ex=WARM_INTERVAL):
+        return
+
+    for namespace, refresh in _refreshers.items():
+        warmed = 0
+        for identifier in await CacheManager.top_accessed(namespace, WARM_TOP_N):
+            key = CacheManager.make_key(namespace, identifier)
+            if await CacheManager.fresh_ttl(key) > WARM_INTERVAL:
+                continue
+            try:
+                if await refresh(identifier) is not None:  # None: refresher skipped it
+                    warmed += 1
+            except Exception as e:
+                print(f"⚠️  Warmer failed for {key}: {e}")
+        await CacheManager.decay_access(namespace)
+        if warmed:
+            print(f"🔥  Warmed {warmed} {namespace} entries")
+
+
+async def _run():
+    while True:
+        await asyncio.sleep(WARM_INTERVAL)
+        try:
+            await warm_once()
+        except Exception as e:
+            print(f"⚠️  Warmer pass failed: {e}")
+
+
+def start_warmer():
+    global _task
+    _task = asyncio.create_task(_run())
+
+
+def stop_warmer():
+    if _task is not None:
+        _task.cancel()
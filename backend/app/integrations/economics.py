@@ -1,63 +1,226 @@
-from fredapi import Fred
-import json
+import asyncio
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from fredapi import Fred
+
+from app.core import frame_store
 from app.core.cache import CacheManager
+from app.core.lru import LRUCache
+from app.core.ratelimit import acquire
+from app.core.warmer import register_refresher
+
+
+# Core set of indicators (keep it small + meaningful)
+FRED_INDICATORS = {
+    "GDP (Real)": "GDPC1",
+    "CPI (All Items)": "CPIAUCSL",
+    "Unemployment Rate": "UNRATE",
+    "Fed Funds Rate": "FEDFUNDS",
+    "10Y Treasury Yield": "DGS10",
+    "Oil Prices": "DCOILWTICO",
+    "S&P 500": "SP500"
+}
+
+FRED_SYNC_INTERVAL = 3600 * 12  # a stored series younger than this is not re-checked upstream
+FRED_REVISION_DAYS = 90         # recent history re-downloaded on each sync to pick up revisions
+BASE_FRAME_TTL = 600            # seconds the merged indicator frame is kept in process
 
+# /economics variants: frequency -> pandas resample rule, aggregation -> resampler method
+FREQUENCIES = {"D": "D", "W": "W-FRI", "M": "ME", "Q": "QE"}
+AGGREGATIONS = ("last", "mean")
+DEFAULT_YEARS = 20
 
-def fetch_macro_indicators(years: int = 20):
+_base_frames = LRUCache(max_items=1, ttl=BASE_FRAME_TTL)
+_builds: dict[str, asyncio.Task] = {}
+
+
+async def fetch_macro_indicators(years: int = DEFAULT_YEARS, force_refresh: bool = False):
     """
     Fetch selected macroeconomic indicators from FRED.
-    Returns last `years` of data, resampled to monthly (last value).
+    Returns last `years` of data, resampled to monthly (last value), as columns:
+    {"dates": ["2005-01-31", ...], "indicators": {"CPI (All Items)": [190.7, ...], ...}}
+    """
+    cache_key = CacheManager.make_key("macro", f"monthly_{years}")
+
+    async def compute():
+        frame = await get_indicator_frame()
+        cutoff = datetime.today() - timedelta(days=years * 365)
+        monthly = frame[frame.index >= cutoff].resample("ME").last().dropna(how="all")
+        return frame_to_columns(monthly)
+
+    return await CacheManager.get_or_compute(cache_key, compute, force_refresh=force_refresh)
+
+
+def resolve_indicators(names: list[str] | None) -> list[str]:
+    """Indicator labels or FRED codes (case-insensitive) -> labels; raises ValueError on unknown names."""
+    if not names:
+        return list(FRED_INDICATORS)
+    lookup = {k.lower(): k for k in FRED_INDICATORS} | {v.lower(): k for k, v in FRED_INDICATORS.items()}
+    unknown = [n for n in names if n.strip().lower() not in lookup]
+    if unknown:
+        raise ValueError(f"Unknown indicators {unknown}; choose from {sorted(FRED_INDICATORS.values())}")
+    return list(dict.fromkeys(lookup[n.strip().lower()] for n in names))
+
+
+async def fetch_macro_view(indicators: list[str] | None = None, start: date | None = None,
+                           end: date | None = None, freq: str = "M", agg: str = "last",
+                           force_refresh: bool = False) -> dict:
+    """
+    A slice of the indicator set: chosen indicators (labels or FRED codes) between
+    start and end (default: the last DEFAULT_YEARS years), resampled to freq
+    (D/W/M/Q) with agg (last/mean). Same columnar shape as fetch_macro_indicators.
+    Each variant is cached on its own; all of them are cut from one in-process base frame.
+    Raises ValueError for unknown indicators, frequencies or aggregations.
+    """
+    labels = resolve_indicators(indicators)
+    if freq not in FREQUENCIES or agg not in AGGREGATIONS:
+        raise ValueError(f"freq must be one of {list(FREQUENCIES)} and agg one of {list(AGGREGATIONS)}")
+    start = start or date.today() - timedelta(days=DEFAULT_YEARS * 365)
+    end = end or date.today()
+    start, end = await _snap_range(labels, start, end)
+
+    codes = "-".join(FRED_INDICATORS[label] for label in labels)
+    cache_key = CacheManager.make_key("macro", f"view_{codes}_{start}_{end}_{freq}_{agg}")
+
+    async def compute():
+        frame = (await get_indicator_frame())[labels]
+        frame = frame[(frame.index >= pd.Timestamp(start)) & (frame.index <= pd.Timestamp(end))]
+        resampled = getattr(frame.resample(FREQUENCIES[freq]), agg)()
+        return frame_to_columns(resampled.dropna(how="all"))
+
+    return await CacheManager.get_or_compute(cache_key, compute, force_refresh=force_refresh)
+
+
+async def _snap_range(labels: list[str], start: date, end: date) -> tuple[date, date]:
+    """
+    Narrows [start, end] to the first / last observation of `labels` inside it, so
+    every request over the same data maps to one cache key. Unchanged when the
+    store cannot be read (the compute step reports that error).
+    """
+    try:
+        observed = (await get_indicator_frame())[labels].dropna(how="all").index
+    except Exception:
+        return start, end
+    inside = observed[(observed >= pd.Timestamp(start)) & (observed <= pd.Timestamp(end))]
+    if inside.empty:
+        return start, end
+    return inside[0].date(), inside[-1].date()
+
+
+async def refresh_macro(identifier: str):
+    """
+    Warmer hook. Only the default monthly_{years} shape is pre-warmed; custom
+    view_* variants are revalidated when read (stale-while-revalidate) and
+    otherwise expire, so their number never grows the warmer's work.
+    """
+    if identifier.startswith("view_"):
+        return None
+    return await fetch_macro_indicators(int(identifier.removeprefix("monthly_")), force_refresh=True)
+
+
+register_refresher("macro", refresh_macro)
+
+
+def frame_to_columns(frame: pd.DataFrame) -> dict:
+    """Date-indexed frame -> {"dates": [...], "indicators": {column: [...]}} with NaN as None."""
+    values = frame.astype(object).where(frame.notna(), None)
+    return {
+        "dates": frame.index.strftime("%Y-%m-%d").tolist(),
+        "indicators": {column: values[column].tolist() for column in frame.columns},
+    }
+
+
+async def get_indicator_frame() -> pd.DataFrame:
+    """
+    The merged indicator frame, rebuilt from the store at most every BASE_FRAME_TTL
+    seconds. Concurrent callers share one rebuild (and so one round of FRED syncs).
+    """
+    frame = _base_frames.get("indicators")
+    if frame is not None:
+        return frame
+    task = _builds.get("indicators")
+    if task is None:
+        task = _builds["indicators"] = asyncio.create_task(load_indicator_frame())
+        task.add_done_callback(lambda _: _builds.pop("indicators", None))
+    frame = await asyncio.shield(task)
+    _base_frames.set("indicators", frame)
+    return frame
+
+
+async def load_indicator_frame() -> pd.DataFrame:
+    """
+    Every indicator's stored history as one frame (union of observation dates,
+    one column per indicator). Series are synced concurrently, each only
+    fetching observations newer than what the local store already has.
     """
-    
-    cache_key = CacheManager.make_key("macro", f"indicators_{years}")
-    cached = CacheManager.get(cache_key)
-    
-    if cached: 
-        print("✅ Loaded macro data from cache")
-        return json.loads(cached)
+    fred = fred_client()
+    series = await asyncio.gather(
+        *(load_fred_series(fred, code) for code in FRED_INDICATORS.values()), return_exceptions=True
+    )
+    columns = {}
+    for label, values in zip(FRED_INDICATORS, series):
+        if isinstance(values, Exception):
+            print(f"❌ Failed {label}: {values}")
+        elif not values.empty:
+            columns[label] = values
+    if not columns:
+        raise RuntimeError("no FRED series available")
+    return pd.concat(columns, axis=1)
 
 
-    print("🌀 Fetching macro data from FRED API...")
+def fred_client() -> Fred:
     api_key = os.getenv("FRED_API_KEY")
     if not api_key:
         raise RuntimeError("FRED_API_KEY not set in environment")
+    return Fred(api_key=api_key)
 
-    fred = Fred(api_key=api_key)
-
-    # Core set of indicators (keep it small + meaningful)
-    indicators = {
-        "GDP (Real)": "GDPC1",
-        "CPI (All Items)": "CPIAUCSL",
-        "Unemployment Rate": "UNRATE",
-        "Fed Funds Rate": "FEDFUNDS",
-        "10Y Treasury Yield": "DGS10",
-        "Oil Prices": "DCOILWTICO",
-        "S&P 500": "SP500"
-    }
 
-    cutoff = datetime.today() - timedelta(days=years*365)
-    data = {}
-
-    for label, code in indicators.items():
-        try:
-            series = fred.get_series(code)
-            # restrict to last N years
-            series = series[series.index >= cutoff]
-
-            # resample everything monthly (latest value each month)
-            series = series.resample("ME").last()
-
-            records = [
-                {"date": d.strftime("%Y-%m-%d"),
-                 "value": float(v) if v == v else None}
-                for d, v in series.items()
-            ]
-            data[label] = records
-        except Exception as e:
-            print(f"❌ Failed {label}: {e}")
-            
-    print(data)
-    CacheManager.set(cache_key, json.dumps(data))
-    return data
+async def get_fred_series(code: str) -> pd.Series:
+    """A single stored FRED series by code (e.g. "SP500"), without loading the whole indicator set."""
+    return await load_fred_series(fred_client(), code)
+
+
+async def load_fred_series(fred: Fred, code: str) -> pd.Series:
+    """
+    One series from the local store, synced with FRED first when it is stale.
+    When the sync fails the stored series is served as-is; with nothing stored
+    the error propagates.
+    """
+    name = f"fred/{code}"
+    age = frame_store.frame_age(name)
+    if age is not None and age < FRED_SYNC_INTERVAL:
+        return (await asyncio.to_thread(frame_store.read_frame, name))["value"]
+    try:
+        await acquire("fred")
+        return await asyncio.to_thread(sync_fred_series, fred, code)
+    except Exception as e:
+        print(f"⚠️  FRED sync failed for {code}: {e}")
+        stored = await asyncio.to_thread(frame_store.read_frame, name)
+        if stored is None or stored.empty:
+            raise
+        return stored["value"]
+
+
+def sync_fred_series(fred: Fred, code: str) -> pd.Series:
+    """
+    Downloads observations since the last stored date (minus FRED_REVISION_DAYS),
+    merges them into the Parquet store and returns the full series (blocking).
+    """
+    name = f"fred/{code}"
+    stored = frame_store.read_frame(name)
+    start = None
+    if stored is not None and not stored.empty:
+        start = (stored.index[-1] - timedelta(days=FRED_REVISION_DAYS)).strftime("%Y-%m-%d")
+
+    print(f"🌀 Syncing FRED {code} from {start or 'the beginning'}...")
+    try:
+        new = fred.get_series(code, observation_start=start)
+    except ValueError:  # fredapi raises when the window has no observations
+        new = pd.Series(dtype="float64")
+
+    if new.empty:
+        frame_store.touch_frame(name)
+        return stored["value"] if stored is not None else new
+    return frame_store.upsert_frame(name, new.astype("float64").to_frame("value"))["value"]
@@ -1,11 +1,17 @@
 # app/services/fetchers/financials.py
 
 import os
-import json
-import requests
+import asyncio
+import httpx
 import yfinance as yf
 from dotenv import load_dotenv
 from app.core.cache import CacheManager
+from app.core.circuit import CircuitOpenError, get_breaker, guarded, rank_providers
+from app.core.http import http_get
+from app.core.ratelimit import RateLimitExceeded
+from app.core.warmer import register_refresher
+from app.utils.concurrency_util import fan_out
+from app.utils.sanitizer_util import sanitize
 
 # === Load environment variables ===
 load_dotenv()
@@ -22,20 +28,36 @@ FMP_KEY = os.getenv("FMPSDK_API_KEY")
 TWELVE_KEY = os.getenv("TWELVE_API_KEY")
 RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
 
+# === Fan-out ===
+FETCH_DEADLINE = 12  # seconds for the whole provider fan-out (per-call timeout is 10s)
+BATCH_CONCURRENCY = 4  # symbols fetched at once by a batch request (keeps us under provider quotas)
+
 
 # =====================================================================
 # 🧩 Generic Safe GET Wrapper
 # =====================================================================
-def safe_get(url, params=None, source_name=""):
+async def safe_get(url, params=None, source_name=""):
     """Perform a safe GET request that never raises; logs minimal info."""
     try:
-        r = requests.get(url, params=params or {}, timeout=10)
+        r = await http_get(url, params=params or {})
         r.raise_for_status()
         data = r.json()
         if isinstance(data, dict) and data.get("status") == "error":
             print(f"⚠️  {source_name}: {data.get('message', 'API returned error')}")
             return None
         return data
+    except RateLimitExceeded as e:
+        print(f"🚦 {source_name} skipped: {e}")
+        return None
+    except CircuitOpenError as e:
+        print(f"⛔ {source_name} skipped: {e}")
+        return None
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 429:
+            print(f"🚦 {source_name} rate-limited upstream (429)")
+        else:
+            print(f"⚠️  {source_name} failed: {e}")
+        return None
     except Exception as e:
         print(f"⚠️  {source_name} failed: {e}")
         return None
@@ -44,44 +66,41 @@ def safe_get(url, params=None, source_name=""):
 # =====================================================================
 # 🧩 YH Finance (RapidAPI SteadyAPI) — Reliable Yahoo Alternative
 # =====================================================================
-def fetch_yahoo_summary(symbol: str) -> dict:
-    """Fetches stock data from YH Finance (RapidAPI by SteadyAPI)."""
-    if not RAPIDAPI_KEY:
-        print("⚠️  RAPIDAPI_KEY missing — skipping YH Finance block")
-        return {}
+YAHOO_ENDPOINTS = {
+    "profile": "profile",
+    "financial": "financial-data",
+    "statistics": "statistics",
+}
+
 
+async def fetch_yahoo_part(symbol: str, endpoint: str) -> dict:
+    """Fetches one YH Finance endpoint; raises on transport errors."""
     headers = {
         "x-rapidapi-key": RAPIDAPI_KEY,
         "x-rapidapi-host": RAPIDAPI_HOST,
     }
+    r = await http_get(
+        f"https://{RAPIDAPI_HOST}/v1/stock/{endpoint}",
+        headers=headers,
+        params={"symbol": symbol},
+    )
+    return r.json()
+
+
+def build_yahoo_summary(symbol: str, prof: dict | None, fin: dict | None, stat: dict | None) -> dict:
+    """Merges the raw YH Finance profile / financial-data / statistics responses."""
+    if not (prof or fin or stat):
+        return {}
 
     try:
         # --- 1️⃣ Profile (sector, industry, country)
-        prof = requests.get(
-            f"https://{RAPIDAPI_HOST}/v1/stock/profile",
-            headers=headers,
-            params={"symbol": symbol},
-            timeout=10,
-        ).json()
-        profile_data = prof.get("quoteSummary", {}).get("result", [{}])[0].get("assetProfile", {})
+        profile_data = (prof or {}).get("quoteSummary", {}).get("result", [{}])[0].get("assetProfile", {})
 
         # --- 2️⃣ Financial data (current price, margins, debt)
-        fin = requests.get(
-            f"https://{RAPIDAPI_HOST}/v1/stock/financial-data",
-            headers=headers,
-            params={"symbol": symbol},
-            timeout=10,
-        ).json()
-        fin_data = fin.get("quoteSummary", {}).get("result", [{}])[0].get("financialData", {})
+        fin_data = (fin or {}).get("quoteSummary", {}).get("result", [{}])[0].get("financialData", {})
 
         # --- 3️⃣ Statistics (valuation ratios)
-        stat = requests.get(
-            f"https://{RAPIDAPI_HOST}/v1/stock/statistics",
-            headers=headers,
-            params={"symbol": symbol},
-            timeout=10,
-        ).json()
-        stat_data = stat.get("quoteSummary", {}).get("result", [{}])[0].get("defaultKeyStatistics", {})
+        stat_data = (stat or {}).get("quoteSummary", {}).get("result", [{}])[0].get("defaultKeyStatistics", {})
 
         # --- ✅ Merge everything ---
         return {
@@ -112,29 +131,129 @@ def fetch_yahoo_summary(symbol: str) -> dict:
 
 
 # =====================================================================
-# 🧩 Main Aggregator (Redis-cached)
+# 🧩 yfinance — dividends
+# =====================================================================
+def fetch_yf_dividends(symbol: str) -> dict:
+    """Returns the last 10 dividend payments from yfinance (blocking; run in a thread)."""
+    ticker = yf.Ticker(symbol)
+    divs = getattr(ticker, "dividends", None)
+    if divs is not None and hasattr(divs, "tail"):
+        return sanitize(divs.tail(10).to_dict())
+    return {}
+
+
 # =====================================================================
-def fetch_stock_financials(symbol: str, force_refresh: bool = False) -> dict:
+# 🧩 Provider fan-out
+# =====================================================================
+# Provider calls that can stand in for each other, per field group, in static
+# preference order. They answer the same question in each provider's own shape
+# (Finnhub quote: c / d / dp / ..., TwelveData quote: close / open / ...), which
+# merge_provider_results keeps apart by task name. A group runs as one task that
+# tries its healthy providers fastest first and moves on when one returns nothing
+# (upstream 429, local rate limit, error body). The profile / metrics / ratios
+# calls and the Yahoo parts each own fields no other provider supplies, so they
+# are always made while their provider's circuit allows it.
+FIELD_ROUTES = {
+    "quote": {"finnhub": "finnhub_quote", "twelvedata": "twelve_quote"},
+}
+
+
+def route_provider_calls(calls: dict) -> dict[str, list[str]]:
     """
-    Robust hybrid financial fetcher combining Finnhub, TwelveData, FMP, yfinance, and YH Finance.
-    Cached in Redis for 24h (from CacheManager presets).
+    Plans the available calls ({task name: (provider, factory)}) as
+    {task: call names to try in order}. Providers with an open circuit are
+    skipped; a field group becomes one task over its healthy providers, fastest
+    first with slow ones last. Calls outside every group run on their own.
     """
-    symbol = symbol.upper()
-    cache_key = CacheManager.make_key("stocks", symbol)
+    routed = {name for candidates in FIELD_ROUTES.values() for name in candidates.values()}
+    routes = {
+        name: [name] for name, (provider, _) in calls.items()
+        if name not in routed and get_breaker(provider).is_available
+    }
+    for group, candidates in FIELD_ROUTES.items():
+        offered = [provider for provider, name in candidates.items() if name in calls]
+        ranked = [candidates[provider] for provider in rank_providers(offered)]
+        if ranked:
+            routes[group] = ranked
 
-    # --- Cache logic ---
-    if not force_refresh:
-        cached = CacheManager.get(cache_key)
-        if cached:
-            print(f"💾  Loaded {symbol} from Redis cache.")
-            try:
-                return json.loads(cached)
-            except Exception:
-                pass
+    unhealthy = sorted({
+        provider for provider, _ in calls.values()
+        if not get_breaker(provider).is_available or get_breaker(provider).is_slow
+    })
+    if unhealthy:
+        planned = {name for names in routes.values() for name in names}
+        print(f"🧭  Routing around {', '.join(unhealthy)}: skipping {', '.join(sorted(set(calls) - planned))}")
+    return routes
+
+
+async def first_answer(calls: dict, names: list[str]) -> dict:
+    """Tries a field group's calls in order; {name: result} of the first that returns data, else {}."""
+    for name in names:
+        result = await calls[name][1]()
+        if result:
+            return {name: result}
+        print(f"↪️  {name} returned nothing, trying the next provider")
+    return {}
+
+
+def build_provider_tasks(symbol: str) -> dict:
+    """
+    Maps a task name to a coroutine for every call the router plans. Field-group
+    tasks (FIELD_ROUTES keys) resolve to {call name: result}; see flatten_results.
+    """
+    calls = {}
+
+    if FINNHUB_KEY:
+        params = {"symbol": symbol, "token": FINNHUB_KEY}
+        calls["finnhub_profile"] = ("finnhub", lambda: safe_get(f"{FINNHUB}/stock/profile2", params, "Finnhub profile"))
+        calls["finnhub_quote"] = ("finnhub", lambda: safe_get(f"{FINNHUB}/quote", params, "Finnhub quote"))
+        calls["finnhub_metrics"] = ("finnhub", lambda: safe_get(f"{FINNHUB}/stock/metric", params, "Finnhub metrics"))
+        calls["finnhub_recs"] = ("finnhub", lambda: safe_get(f"{FINNHUB}/stock/recommendation", params, "Finnhub recs"))
     else:
-        print(f"🔄  Force-refreshing {symbol} cache...")
+        print("⚠️  FINNHUB_API_KEY missing — skipping Finnhub block")
+
+    if TWELVE_KEY:
+        calls["twelve_quote"] = ("twelvedata", lambda: safe_get(
+            f"{TWELVE}/quote", {"symbol": symbol, "apikey": TWELVE_KEY}, "TwelveData quote"
+        ))
+    else:
+        print("⚠️  TWELVE_API_KEY missing — skipping TwelveData block")
+
+    if FMP_KEY:
+        calls["fmp_ratios"] = ("fmp", lambda: safe_get(f"{FMP}/ratios/{symbol}", {"apikey": FMP_KEY}, "FMP ratios"))
+        calls["fmp_income"] = ("fmp", lambda: safe_get(
+            f"{FMP}/income-statement/{symbol}", {"limit": 1, "apikey": FMP_KEY}, "FMP income"
+        ))
+    else:
+        print("⚠️  FMPSDK_API_KEY missing — skipping FMP block")
+
+    calls["yf_dividends"] = ("yfinance", lambda: guarded("yfinance", asyncio.to_thread, fetch_yf_dividends, symbol))
+
+    if RAPIDAPI_KEY:
+        for name, endpoint in YAHOO_ENDPOINTS.items():
+            calls[f"yahoo_{name}"] = ("rapidapi", lambda endpoint=endpoint: fetch_yahoo_part(symbol, endpoint))
+    else:
+        print("⚠️  RAPIDAPI_KEY missing — skipping YH Finance block")
+
+    return {
+        task: first_answer(calls, names) if task in FIELD_ROUTES else calls[task][1]()
+        for task, names in route_provider_calls(calls).items()
+    }
 
-    # --- Fetch fresh data ---
+
+def flatten_results(results: dict) -> dict:
+    """Unpacks field-group results so every answer sits under its own call name."""
+    flat = {name: result for name, result in results.items() if name not in FIELD_ROUTES}
+    for group in FIELD_ROUTES:
+        flat.update(results.get(group) or {})
+    return flat
+
+
+def merge_provider_results(symbol: str, results: dict) -> dict:
+    """
+    Merges raw provider responses in a fixed precedence order,
+    independent of the order in which they arrived.
+    """
     merged = {
         "symbol": symbol,
         "info": {},
@@ -148,104 +267,177 @@ def fetch_stock_financials(symbol: str, force_refresh: bool = False) -> dict:
     # ------------------------------
     # 1️⃣ Finnhub — Profile / Quote / Metrics / Recommendations
     # ------------------------------
-    if FINNHUB_KEY:
-        profile = safe_get(f"{FINNHUB}/stock/profile2", {"symbol": symbol, "token": FINNHUB_KEY}, "Finnhub profile")
-        quote = safe_get(f"{FINNHUB}/quote", {"symbol": symbol, "token": FINNHUB_KEY}, "Finnhub quote")
-        metrics = safe_get(f"{FINNHUB}/stock/metric", {"symbol": symbol, "token": FINNHUB_KEY}, "Finnhub metrics")
-        recs = safe_get(f"{FINNHUB}/stock/recommendation", {"symbol": symbol, "token": FINNHUB_KEY}, "Finnhub recs")
-
-        if profile:
-            merged["info"].update({
-                "shortName": profile.get("name"),
-                "sector": profile.get("finnhubIndustry"),
-                "country": profile.get("country"),
-                "currency": profile.get("currency"),
-            })
-            merged["sources"]["profile"] = "finnhub"
-
-        if metrics:
-            m = metrics.get("metric", {})
-            merged["info"].update({
-                "marketCap": m.get("marketCapitalization"),
-                "trailingPE": m.get("peBasicExclExtraTTM"),
-                "priceToBook": m.get("pbAnnual"),
-                "roe": m.get("roeTTM"),
-                "grossMargin": m.get("grossMarginTTM"),
-            })
-            merged["sources"]["metrics"] = "finnhub"
-
-        if quote:
-            merged["quote"] = quote
-            merged["sources"]["quote"] = "finnhub"
-
-        if recs:
-            merged["analyst_data"] = recs
-            merged["sources"]["analyst_data"] = "finnhub"
-    else:
-        print("⚠️  FINNHUB_API_KEY missing — skipping Finnhub block")
+    profile = results.get("finnhub_profile")
+    quote = results.get("finnhub_quote")
+    metrics = results.get("finnhub_metrics")
+    recs = results.get("finnhub_recs")
+
+    if profile:
+        merged["info"].update({
+            "shortName": profile.get("name"),
+            "sector": profile.get("finnhubIndustry"),
+            "country": profile.get("country"),
+            "currency": profile.get("currency"),
+        })
+        merged["sources"]["profile"] = "finnhub"
+
+    if metrics:
+        m = metrics.get("metric", {})
+        merged["info"].update({
+            "marketCap": m.get("marketCapitalization"),
+            "trailingPE": m.get("peBasicExclExtraTTM"),
+            "priceToBook": m.get("pbAnnual"),
+            "roe": m.get("roeTTM"),
+            "grossMargin": m.get("grossMarginTTM"),
+        })
+        merged["sources"]["metrics"] = "finnhub"
+
+    if quote:
+        merged["quote"] = quote
+        merged["sources"]["quote"] = "finnhub"
+
+    if recs:
+        merged["analyst_data"] = recs
+        merged["sources"]["analyst_data"] = "finnhub"
 
     # ------------------------------
     # 2️⃣ TwelveData — fallback for quote
     # ------------------------------
-    if TWELVE_KEY:
-        td_quote = safe_get(f"{TWELVE}/quote", {"symbol": symbol, "apikey": TWELVE_KEY}, "TwelveData quote")
-        if td_quote and not merged["quote"]:
-            merged["quote"] = td_quote
-            merged["sources"]["quote"] = "twelvedata"
-    else:
-        print("⚠️  TWELVE_API_KEY missing — skipping TwelveData block")
+    td_quote = results.get("twelve_quote")
+    if td_quote and not merged["quote"]:
+        merged["quote"] = td_quote
+        merged["sources"]["quote"] = "twelvedata"
 
     # ------------------------------
     # 3️⃣ FMP — supplemental ratios + financials
     # ------------------------------
-    if FMP_KEY:
-        fmp_ratios = safe_get(f"{FMP}/ratios/{symbol}", {"apikey": FMP_KEY}, "FMP ratios")
-        if fmp_ratios and isinstance(fmp_ratios, list):
-            latest = fmp_ratios[0]
-            merged["info"].update({
-                "priceToSales": latest.get("priceToSalesRatio"),
-                "debtToEquity": latest.get("debtEquityRatio"),
-                "dividendYield": latest.get("dividendYield"),
-            })
-            merged["sources"]["ratios"] = "fmp"
-
-        fmp_income = safe_get(f"{FMP}/income-statement/{symbol}", {"limit": 1, "apikey": FMP_KEY}, "FMP income")
-        if fmp_income and isinstance(fmp_income, list):
-            merged["financials"]["income_statement"] = fmp_income[0]
-            merged["sources"]["financials"] = "fmp"
-    else:
-        print("⚠️  FMPSDK_API_KEY missing — skipping FMP block")
+    fmp_ratios = results.get("fmp_ratios")
+    if fmp_ratios and isinstance(fmp_ratios, list):
+        latest = fmp_ratios[0]
+        merged["info"].update({
+            "priceToSales": latest.get("priceToSalesRatio"),
+            "debtToEquity": latest.get("debtEquityRatio"),
+            "dividendYield": latest.get("dividendYield"),
+        })
+        merged["sources"]["ratios"] = "fmp"
+
+    fmp_income = results.get("fmp_income")
+    if fmp_income and isinstance(fmp_income, list):
+        merged["financials"]["income_statement"] = fmp_income[0]
+        merged["sources"]["financials"] = "fmp"
 
     # ------------------------------
     # 4️⃣ yfinance — dividends fallback
     # ------------------------------
-    try:
-        ticker = yf.Ticker(symbol)
-        divs = getattr(ticker, "dividends", None)
-        if divs is not None and hasattr(divs, "tail"):
-            dividends = divs.tail(10).to_dict()
-            if dividends:
-                merged["dividends"] = dividends
-                merged["sources"]["dividends"] = "yfinance"
-    except Exception as e:
-        print(f"⚠️  yfinance failed for {symbol}: {e}")
+    dividends = results.get("yf_dividends")
+    if dividends:
+        merged["dividends"] = dividends
+        merged["sources"]["dividends"] = "yfinance"
 
     # ------------------------------
     # 5️⃣ YH Finance (RapidAPI) — final fallback
     # ------------------------------
-    yahoo_summary = fetch_yahoo_summary(symbol)
+    yahoo_summary = build_yahoo_summary(
+        symbol,
+        results.get("yahoo_profile"),
+        results.get("yahoo_financial"),
+        results.get("yahoo_statistics"),
+    )
     if yahoo_summary:
         merged["info"].update(yahoo_summary.get("info", {}))
         merged["quote"].update(yahoo_summary.get("quote", {}))
         merged["financials"].update(yahoo_summary.get("financials", {}))
         merged["sources"]["yahoo"] = "rapidapi"
 
+    return merged
+
+
+# =====================================================================
+# 🧩 Main Aggregator (Redis-cached)
+# =====================================================================
+async def fetch_stock_financials(symbol: str, force_refresh: bool = False) -> dict:
+    """
+    Robust hybrid financial fetcher combining Finnhub, TwelveData, FMP, yfinance, and YH Finance.
+    The routed provider calls are sent at once and share one FETCH_DEADLINE, so a cold
+    lookup costs roughly the slowest provider rather than the sum of all of them;
+    providers whose circuit is open (or that are slow) are routed around.
+    Cached in Redis for 24h (from CacheManager presets); concurrent misses for the
+    same symbol share a single fetch.
+    """
+    symbol = symbol.upper()
+    cache_key = CacheManager.make_key("stocks", symbol)
+
+    if force_refresh:
+        print(f"🔄  Force-refreshing {symbol} cache...")
+
+    return await CacheManager.get_or_compute(
+        cache_key, lambda: fetch_fresh_financials(symbol), force_refresh=force_refresh
+    )
+
+
+register_refresher("stocks", lambda symbol: fetch_stock_financials(symbol, force_refresh=True))
+
+
+async def fetch_fresh_financials(symbol: str) -> dict:
+    """Fetches every provider concurrently and merges the results (no cache)."""
+    results = flatten_results(await fan_out(build_provider_tasks(symbol), deadline=FETCH_DEADLINE))
+    merged = merge_provider_results(symbol, results)
+
     # ------------------------------
     # ✅ Final summary
     # ------------------------------
     filled_fields = sum(1 for v in merged["info"].values() if v)
     print(f"✅  {symbol}: fetched with {filled_fields} info fields filled.")
-
-    # --- Save in Redis ---
-    CacheManager.set(cache_key, json.dumps(merged))
     return merged
+
+
+# =====================================================================
+# 🧩 Batch Aggregator
+# =====================================================================
+async def _refresh_financials(keys: list[str]):
+    """get_many refresh hook: refetches stale symbols, BATCH_CONCURRENCY at a time."""
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def refresh(key: str):
+        async with semaphore:
+            await CacheManager.set(key, await fetch_fresh_financials(CacheManager.split_key(key)[1]))
+
+    await asyncio.gather(*(refresh(key) for key in keys), return_exceptions=True)
+
+
+async def fetch_stock_financials_batch(symbols: list[str], force_refresh: bool = False):
+    """
+    Yields (symbol, data, cached) for many symbols as each one becomes available.
+    Cache hits are read with a single MGET and yielded first; only the misses
+    are fetched, BATCH_CONCURRENCY symbols at a time.
+    """
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    misses = symbols
+
+    if not force_refresh:
+        keys = [CacheManager.make_key("stocks", s) for s in symbols]
+        await CacheManager.record_access(keys)
+        misses = []
+        for symbol, data in zip(symbols, await CacheManager.get_many(keys, refresh=_refresh_financials)):
+            if data is None:
+                misses.append(symbol)
+            else:
+                yield symbol, data, True
+
+    if not misses:
+        return
+
+    print(f"🌀  Batch: fetching {len(misses)}/{len(symbols)} symbols from providers...")
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def fetch_one(symbol: str):
+        async with semaphore:
+            try:
+                return symbol, await fetch_stock_financials(symbol, force_refresh)
+            except Exception as e:
+                print(f"⚠️  Batch fetch failed for {symbol}: {e}")
+                return symbol, {"error": str(e)}
+
+    for next_done in asyncio.as_completed([fetch_one(s) for s in misses]):
+        symbol, data = await next_done
+        yield symbol, data, False
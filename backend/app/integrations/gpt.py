@@ -1,27 +1,88 @@
 # app/services/gpt.py
 
 import os
+import re
 import json
+import hashlib
+import orjson
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 # internal helpers
+from app.core.cache import CacheManager
+from app.core.config import settings
+from app.utils.payload_util import compact_payload, to_json
 from app.utils.sanitizer_util import sanitize
-from app.services.fetchers.financials import fetch_stock_financials  # summarize_financials removed
 
 load_dotenv()  # Load environment variables from .env
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=settings.OPENAI_BASE_URL)
 
+# Bump whenever SYSTEM_PROMPT or SCORE_RESPONSE_FORMAT changes, so cached scores
+# produced by the old prompt are no longer served.
+PROMPT_VERSION = "v2"
 
-def score_stock(financial_data: dict, news_data: dict | list, economical_data: dict) -> dict:
+SYSTEM_PROMPT = """You are a world-class equity analyst and quant strategist.
+                        Evaluate the investment quality of a stock from 0 to 100 using 
+                        fundamentals, macroeconomic data, and recent news.
+
+                        Follow this rubric strictly:
+
+                        1. Profitability & Margins (0–17)
+                        2. Growth & Stability (0–17)
+                        3. Valuation (0–17)
+                        4. Balance Sheet & Risk (0–17)
+                        5. Market & News Signals (0–16)
+                        6. Macro & Market Conditions (0–16)
+
+                        Scoring scale:
+                        0–20 = Extremely weak, avoid
+                        21–40 = Weak, speculative
+                        41–60 = Average, mixed signals
+                        61–80 = Strong, attractive
+                        81–100 = Exceptional, top-tier
+
+                        Output concise, data-backed insights only.
+                        JSON schema:
+                        {
+                            "score": integer,
+                            "summary": string,
+                            "positives": [string],
+                            "negatives": [string]
+                        }
+                        """
+
+SCORE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "stock_score",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "score": {"type": "integer"},
+                "summary": {"type": "string"},
+                "positives": {
+                    "type": "array",
+                    "items": {"type": "string"}
+                },
+                "negatives": {
+                    "type": "array",
+                    "items": {"type": "string"}
+                },
+            },
+            "required": ["score", "summary"]
+        },
+    },
+}
+
+
+def build_safe_payload(financial_data: dict, news_data: dict | list, economical_data: dict) -> dict:
     """
-    Evaluate a stock using financial, macroeconomic, and news data via GPT model.
-    Returns a structured score with summary, positives, and negatives.
+    Safe, minimal payload sent to the model, compacted to fit
+    settings.GPT_PROMPT_TOKEN_BUDGET (see payload_util.compact_payload).
     """
-
     info = financial_data.get("info", {})
+    statements = financial_data.get("financials", {})
 
-    # --- Safe, minimal payload ---
     safe_payload = {
         "company_overview": {
             "name": info.get("shortName"),
@@ -41,94 +102,185 @@ def score_stock(financial_data: dict, news_data: dict | list, economical_data: d
             "beta": info.get("beta"),
         },
         "financials": {
-            "income_statement": financial_data.get("income_statement"),
-            "balance_sheet": financial_data.get("balance_sheet"),
-            "cash_flow": financial_data.get("cash_flow"),
+            "income_statement": statements.get("income_statement"),
+            "balance_sheet": statements.get("balance_sheet"),
+            "cash_flow": statements.get("cash_flow"),
         },
         "analyst_data": financial_data.get("analyst_data"),
-        "news_data": news_data[:20] if isinstance(news_data, list) else news_data,  # limit for safety
+        "news_data": news_data,
         "economical_data": economical_data,
     }
+    keywords = [financial_data.get("symbol"), info.get("shortName")]
+    return compact_payload(sanitize(safe_payload), settings.GPT_PROMPT_TOKEN_BUDGET, keywords)
 
-    # --- Truncate for token safety ---
-    safe_payload_json = json.dumps(safe_payload, ensure_ascii=False)[:20000]
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-5-nano-2025-08-07",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        """You are a world-class equity analyst and quant strategist.
-                        Evaluate the investment quality of a stock from 0 to 100 using 
-                        fundamentals, macroeconomic data, and recent news.
+def build_messages(safe_payload: dict) -> list[dict]:
+    """Chat messages for one scoring request (payload already fits the token budget)."""
+    safe_payload_json = to_json(safe_payload)
 
-                        Follow this rubric strictly:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": f"Stock data (financials, macro, news): {safe_payload_json}"
+        }
+    ]
 
-                        1. Profitability & Margins (0–17)
-                        2. Growth & Stability (0–17)
-                        3. Valuation (0–17)
-                        4. Balance Sheet & Risk (0–17)
-                        5. Market & News Signals (0–16)
-                        6. Macro & Market Conditions (0–16)
 
-                        Scoring scale:
-                        0–20 = Extremely weak, avoid
-                        21–40 = Weak, speculative
-                        41–60 = Average, mixed signals
-                        61–80 = Strong, attractive
-                        81–100 = Exceptional, top-tier
+def parse_score(content: str) -> dict:
+    """Parses the model's JSON answer and fills in optional keys."""
+    parsed = json.loads(content)
 
-                        Output concise, data-backed insights only.
-                        JSON schema:
-                        {
-                            "score": integer,
-                            "summary": string,
-                            "positives": [string],
-                            "negatives": [string]
-                        }
-                        """
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": f"Stock data (financials, macro, news): {safe_payload_json}"
-                }
-            ],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "stock_score",
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "score": {"type": "integer"},
-                            "summary": {"type": "string"},
-                            "positives": {
-                                "type": "array",
-                                "items": {"type": "string"}
-                            },
-                            "negatives": {
-                                "type": "array",
-                                "items": {"type": "string"}
-                            },
-                        },
-                        "required": ["score", "summary"]
-                    },
-                },
-            },
-        )
+    # Ensure keys always exist
+    parsed.setdefault("positives", [])
+    parsed.setdefault("negatives", [])
+
+    return sanitize(parsed)
+
+
+def score_cache_key(safe_payload: dict, model: str | None = None) -> str:
+    """Content address of a scoring request: normalized payload + model + prompt version."""
+    normalized = orjson.dumps(
+        sanitize(safe_payload), option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+    )
+    digest = hashlib.sha256(normalized)
+    digest.update(f"|{model or settings.OPENAI_MODEL}|{PROMPT_VERSION}".encode())
+    return CacheManager.make_key("scores", digest.hexdigest())
 
-        content = response.choices[0].message.content
-        parsed = json.loads(content)
 
-        # Ensure keys always exist
-        parsed.setdefault("positives", [])
-        parsed.setdefault("negatives", [])
+async def request_score(safe_payload: dict) -> dict:
+    """One chat completion (no cache); raises on failure."""
+    response = await client.chat.completions.create(
+        model=settings.OPENAI_MODEL,
+        messages=build_messages(safe_payload),
+        response_format=SCORE_RESPONSE_FORMAT,
+    )
+    return parse_score(response.choices[0].message.content)
 
-        return sanitize(parsed)
+
+async def score_stock(financial_data: dict, news_data: dict | list, economical_data: dict,
+                      use_cache: bool = True) -> dict:
+    """
+    Evaluate a stock using financial, macroeconomic, and news data via GPT model.
+    Returns a structured score with summary, positives, and negatives.
+    Scores are cached under a hash of the payload, model and prompt version, so
+    unchanged inputs are not re-scored; use_cache=False forces a fresh completion.
+    """
+    safe_payload = build_safe_payload(financial_data, news_data, economical_data)
+    cache_key = score_cache_key(safe_payload)
+    computed = False
+
+    async def compute():
+        nonlocal computed
+        computed = True
+        return await request_score(safe_payload)
+
+    try:
+        result = await CacheManager.get_or_compute(
+            cache_key, compute, ttl=settings.GPT_SCORE_TTL, force_refresh=not use_cache
+        )
+        outcome = "bypassed" if not use_cache else "misses" if computed else "hits"
+        await CacheManager.incr_metric("gpt_score", outcome)
+        return result
 
     except Exception as e:
         print(f"[ERROR] GPT scoring failed: {e}")
         return {"error": str(e)}
+
+
+class SummaryExtractor:
+    """
+    Incrementally pulls the text of the "summary" string out of a streamed JSON
+    answer: feed() each content delta and get back the newly completed summary
+    characters (escapes decoded, surrogate pairs joined; a partial escape waits
+    for the next delta).
+    """
+    KEY = re.compile(r'"summary"\s*:\s*"')
+    ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos: int | None = None  # next unread character of the summary string
+        self.done = False
+
+    def feed(self, delta: str) -> str:
+        self.buffer += delta
+        if self.done:
+            return ""
+        if self.pos is None:
+            match = self.KEY.search(self.buffer)
+            if match is None:
+                return ""
+            self.pos = match.end()
+
+        out, text, i = [], self.buffer, self.pos
+        while i < len(text):
+            char = text[i]
+            if char == '"':
+                self.done = True
+                break
+            if char == "\\":
+                if i + 1 >= len(text):
+                    break
+                code = text[i + 1]
+                if code == "u":
+                    if i + 6 > len(text):
+                        break
+                    value, step = int(text[i + 2:i + 6], 16), 6
+                    if 0xD800 <= value < 0xDC00 and (text.startswith("\\u", i + 6) or text[i + 6:] in ("", "\\")):
+                        # high surrogate: pair it with the low-surrogate escape that follows
+                        if i + 12 > len(text):
+                            break
+                        low = int(text[i + 8:i + 12], 16)
+                        if 0xDC00 <= low < 0xE000:
+                            value, step = 0x10000 + ((value - 0xD800) << 10) + (low - 0xDC00), 12
+                    if 0xD800 <= value < 0xE000:
+                        value = 0xFFFD  # unpaired surrogate: not encodable as UTF-8
+                    out.append(chr(value))
+                    i += step
+                    continue
+                out.append(self.ESCAPES.get(code, code))
+                i += 2
+                continue
+            out.append(char)
+            i += 1
+        self.pos = i
+        return "".join(out)
+
+
+async def stream_score(financial_data: dict, news_data: dict | list, economical_data: dict,
+                       use_cache: bool = True):
+    """
+    Streaming counterpart of score_stock.
+    Yields ("token", text) with each new piece of the summary text while the model
+    answers (the JSON around it is not forwarded), then ("result", score) once.
+    A cached score is yielded directly as the result.
+    """
+    safe_payload = build_safe_payload(financial_data, news_data, economical_data)
+    cache_key = score_cache_key(safe_payload)
+
+    if use_cache:
+        cached = await CacheManager.get(cache_key)
+        if cached is not None:
+            await CacheManager.incr_metric("gpt_score", "hits")
+            yield "result", cached
+            return
+    await CacheManager.incr_metric("gpt_score", "misses" if use_cache else "bypassed")
+
+    stream = await client.chat.completions.create(
+        model=settings.OPENAI_MODEL,
+        messages=build_messages(safe_payload),
+        response_format=SCORE_RESPONSE_FORMAT,
+        stream=True,
+    )
+    chunks, summary = [], SummaryExtractor()
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            chunks.append(chunk.choices[0].delta.content)
+            text = summary.feed(chunk.choices[0].delta.content)
+            if text:
+                yield "token", text
+
+    result = parse_score("".join(chunks))
+    await CacheManager.set(cache_key, result, ttl=settings.GPT_SCORE_TTL)
+    yield "result", result
@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+from openai import AsyncOpenAI
+
+from app.core.cache import CacheManager, PREFIX, r, encode, decode
+from app.core.config import settings
+from app.integrations.economics import fetch_macro_indicators
+from app.integrations.financials import BATCH_CONCURRENCY, fetch_stock_financials
+from app.integrations.gpt import (
+    SCORE_RESPONSE_FORMAT,
+    build_messages,
+    build_safe_payload,
+    parse_score,
+    score_cache_key,
+)
+from app.integrations.news import get_news
+from app.utils.concurrency_util import spawn
+
+# OpenAI Batch API (swap OPENAI_BATCH_BASE_URL for a local stub in tests)
+batch_client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    base_url=settings.OPENAI_BATCH_BASE_URL or settings.OPENAI_BASE_URL,
+)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+JOB_TTL = 86400 * 7  # job state is kept for a week
+
+# OpenAI batch statuses after which nothing changes any more
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# Our own statuses while inputs are gathered and the batch is submitted
+PREPARING_STATUSES = {"preparing", "submitting"}
+PROGRESS_EVERY = 25      # symbols between job progress saves while gathering inputs
+PREPARE_STALL = 60 * 15  # a preparing job without progress for this long was interrupted
+
+
+def _job_key(job_id: str) -> str:
+    return f"{PREFIX}:batchjobs:{job_id}"
+
+
+async def _save_job(job: dict):
+    job["updated_at"] = int(time.time())
+    await r.set(_job_key(job["job_id"]), encode(job), ex=JOB_TTL)
+
+
+async def get_job(job_id: str) -> dict | None:
+    return decode(await r.get(_job_key(job_id)))
+
+
+async def _store_results(job_id: str, results: dict):
+    """Adds symbol -> score entries to the job's results hash."""
+    if not results:
+        return
+    results_key = f"{_job_key(job_id)}:results"
+    await r.hset(results_key, mapping={s: encode(v) for s, v in results.items()})
+    await r.expire(results_key, JOB_TTL)
+
+
+async def _build_payloads(symbols: list[str], on_progress=None) -> dict:
+    """
+    symbol -> safe_payload, gathered BATCH_CONCURRENCY symbols at a time.
+    `on_progress(done)` is awaited after every PROGRESS_EVERY symbols.
+    """
+    economical_data = await fetch_macro_indicators()
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    done = 0
+
+    async def build(symbol: str):
+        nonlocal done
+        async with semaphore:
+            try:
+                financial_data, news_data = await asyncio.gather(
+                    fetch_stock_financials(symbol), get_news(symbol)
+                )
+                return symbol, build_safe_payload(financial_data, news_data, economical_data)
+            except Exception as e:
+                print(f"⚠️  Batch scoring: skipping {symbol}: {e}")
+                return symbol, None
+            finally:
+                done += 1
+                if on_progress is not None and done % PROGRESS_EVERY == 0:
+                    await on_progress(done)
+
+    pairs = await asyncio.gather(*(build(s) for s in symbols))
+    return {symbol: payload for symbol, payload in pairs if payload is not None}
+
+
+async def submit_batch_scoring(symbols: list[str]) -> dict:
+    """
+    Score many symbols through one OpenAI batch job.
+    The job record is stored and returned right away (status "preparing");
+    inputs are gathered and the batch is submitted in the background.
+    Returns the job record stored in Redis.
+    """
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    now = int(time.time())
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "created_at": now,
+        "updated_at": now,
+        "status": "preparing",
+        "openai_batch_id": None,
+        "symbols": symbols,
+        "inputs_ready": 0,
+        "cache_keys": {},
+        "pending": symbols,
+        "failed": {},
+        "cached": [],
+    }
+    await _save_job(job)
+    spawn(_prepare_and_submit(job))
+    return job
+
+
+async def _prepare_and_submit(job: dict):
+    """
+    Background half of submit_batch_scoring: gathers inputs (saving progress),
+    resolves symbols whose inputs already have a cached score, and submits the
+    rest. Uses the same prompt and JSON schema as score_stock.
+    """
+    async def progress(done: int):
+        job["inputs_ready"] = done
+        await _save_job(job)
+
+    try:
+        symbols = job["symbols"]
+        payloads = await _build_payloads(symbols, on_progress=progress)
+        cache_keys = {symbol: score_cache_key(payload) for symbol, payload in payloads.items()}
+
+        cached = await CacheManager.get_many(list(cache_keys.values()))
+        results = {symbol: hit for symbol, hit in zip(cache_keys, cached) if hit is not None}
+        pending = [symbol for symbol in cache_keys if symbol not in results]
+
+        job.update({
+            "status": "completed" if not pending else "submitting",
+            "inputs_ready": len(symbols),
+            "cache_keys": cache_keys,
+            "pending": pending,
+            "failed": {s: "input data unavailable" for s in symbols if s not in payloads},
+            "cached": sorted(results),
+        })
+        await _store_results(job["job_id"], results)
+        await _save_job(job)
+
+        if pending:
+            lines = [
+                json.dumps({
+                    "custom_id": symbol,
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": {
+                        "model": settings.OPENAI_MODEL,
+                        "messages": build_messages(payloads[symbol]),
+                        "response_format": SCORE_RESPONSE_FORMAT,
+                    },
+                }, ensure_ascii=False)
+                for symbol in pending
+            ]
+            input_file = await batch_client.files.create(
+                file=("scores.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch"
+            )
+            batch = await batch_client.batches.create(
+                input_file_id=input_file.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window=COMPLETION_WINDOW,
+                metadata={"marketly_job_id": job["job_id"]},
+            )
+            job["openai_batch_id"] = batch.id
+            job["status"] = batch.status
+        print(f"📦  Batch scoring job {job['job_id']}: {len(pending)} submitted, {len(results)} cached")
+    except Exception as e:
+        print(f"[ERROR] Batch scoring submit failed: {e}")
+        job["status"] = "failed"
+        job["error"] = str(e)
+    await _save_job(job)
+
+
+async def poll_batch_job(job_id: str) -> dict | None:
+    """
+    Refresh a job's status from OpenAI. When the batch has completed, its
+    output is parsed once, written to the score cache and to the job results.
+    """
+    job = await get_job(job_id)
+    if job is not None and job["status"] in PREPARING_STATUSES \
+            and time.time() - job.get("updated_at", job["created_at"]) > PREPARE_STALL:
+        job["status"] = "failed"
+        job["error"] = "submission was interrupted"
+        await _save_job(job)
+    if job is None or not job.get("openai_batch_id") or job.get("collected"):
+        return job
+
+    batch = await batch_client.batches.retrieve(job["openai_batch_id"])
+    job["status"] = batch.status
+    job["request_counts"] = batch.request_counts.model_dump() if batch.request_counts else None
+
+    if batch.status in FINAL_STATUSES:
+        await _collect_results(job, batch)
+        job["collected"] = True
+
+    await _save_job(job)
+    return job
+
+
+async def _collect_results(job: dict, batch):
+    """Fan completed batch outputs back into the score cache."""
+    results = {}
+
+    if batch.output_file_id:
+        output = await batch_client.files.content(batch.output_file_id)
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            symbol = row.get("custom_id")
+            try:
+                body = row["response"]["body"]
+                results[symbol] = parse_score(body["choices"][0]["message"]["content"])
+            except Exception as e:
+                job["failed"][symbol] = row.get("error") or str(e)
+
+    if batch.error_file_id:
+        errors = await batch_client.files.content(batch.error_file_id)
+        for line in errors.text.splitlines():
+            if line.strip():
+                row = json.loads(line)
+                job["failed"][row.get("custom_id")] = row.get("error") or "request failed"
+
+    for symbol, result in results.items():
+        cache_key = job["cache_keys"].get(symbol)
+        if cache_key:
+            await CacheManager.set(cache_key, result, ttl=settings.GPT_SCORE_TTL)
+
+    await _store_results(job["job_id"], results)
+    job["pending"] = [s for s in job["pending"] if s not in results and s not in job["failed"]]
+    print(f"📦  Batch scoring job {job['job_id']}: collected {len(results)} scores")
+
+
+async def get_batch_results(job_id: str) -> dict | None:
+    """Job status plus every score collected so far (symbol -> score)."""
+    job = await poll_batch_job(job_id)
+    if job is None:
+        return None
+    raw = await r.hgetall(f"{_job_key(job_id)}:results")
+    scores = {k.decode(): decode(v) for k, v in raw.items()}
+    return {**job, "results": scores}
@@ -0,0 +1,162 @@
+import asyncio
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from app.core import frame_store
+from app.core.circuit import guarded
+from app.core.lru import LRUCache
+from app.utils.downsample_util import lttb, ohlc_buckets
+
+# interval -> (first download period, seconds before the store is topped up again)
+INTERVALS = {
+    "1h": ("730d", 900),     # Yahoo keeps ~2 years of hourly bars
+    "1d": ("max", 3600 * 4),
+    "1wk": ("max", 86400),
+    "1mo": ("max", 86400),
+}
+COLUMNS = ["open", "high", "low", "close", "volume"]
+STORED_COLUMNS = COLUMNS + ["splits"]  # splits: Yahoo split ratio on split days, else 0
+DOWNSAMPLE_METHODS = ("lttb", "ohlc")
+SPLIT_TOLERANCE = 0.02  # relative close change of a completed bar that means history was rescaled
+
+_frames = LRUCache(max_items=128, ttl=60)  # recently served frames, in process
+_syncs: dict[str, asyncio.Task] = {}
+
+
+def _name(symbol: str, interval: str) -> str:
+    return f"history/{interval}/{symbol}"
+
+
+def _clean_bars(bars: pd.DataFrame) -> pd.DataFrame:
+    bars = bars.rename(columns={"Stock Splits": "splits"}).rename(columns=str.lower)
+    if "splits" not in bars:
+        bars["splits"] = 0.0
+    bars = bars[STORED_COLUMNS].astype("float64").dropna(subset=["close"])
+    if bars.index.tz is not None:
+        bars.index = bars.index.tz_localize(None)
+    return bars
+
+
+def _needs_rebase(stored: pd.DataFrame, bars: pd.DataFrame) -> bool:
+    """
+    Yahoo closes are split-adjusted as of download time. A split since the last sync
+    shows up as a "Stock Splits" entry after the overlap bar, or as a different
+    close for the overlap bar (a completed bar, so it must match the stored one).
+    """
+    overlap = stored.index[-2] if len(stored) > 1 else stored.index[-1]
+    splits = bars.get("Stock Splits")
+    index = bars.index.tz_localize(None) if bars.index.tz is not None else bars.index
+    if splits is not None and (splits.to_numpy()[index > overlap] != 0).any():
+        return True
+    if overlap not in index:
+        return False
+    fresh = float(bars["Close"].to_numpy()[index.get_loc(overlap)])
+    return abs(fresh / stored.at[overlap, "close"] - 1) > SPLIT_TOLERANCE
+
+
+def sync_history(symbol: str, interval: str) -> pd.DataFrame | None:
+    """
+    Appends bars newer than the last complete stored one (the last stored bar is
+    re-read since it may have been partial) and returns the full stored frame
+    (blocking). After a split the whole period is re-downloaded and replaces the
+    store, since every older bar is now on the wrong scale.
+    """
+    name = _name(symbol, interval)
+    stored = frame_store.read_frame(name)
+    ticker = yf.Ticker(symbol)
+    period = INTERVALS[interval][0]
+    if stored is None or stored.empty:
+        bars = ticker.history(period=period, interval=interval, auto_adjust=False)
+        if bars is None or bars.empty:
+            return stored
+        bars = _clean_bars(bars)
+        print(f"📈 {symbol} {interval}: stored {len(bars)} bars from {bars.index[0]:%Y-%m-%d}")
+        return frame_store.replace_frame(name, bars)
+
+    overlap = stored.index[-2] if len(stored) > 1 else stored.index[-1]
+    bars = ticker.history(start=overlap.strftime("%Y-%m-%d"), interval=interval, auto_adjust=False)
+    if bars is None or bars.empty:
+        frame_store.touch_frame(name)
+        return stored
+
+    if _needs_rebase(stored, bars):
+        print(f"✂️  {symbol} {interval}: split detected, re-downloading full history")
+        full = ticker.history(period=period, interval=interval, auto_adjust=False)
+        if full is not None and not full.empty:
+            return frame_store.replace_frame(name, _clean_bars(full))
+
+    bars = _clean_bars(bars)
+    print(f"📈 {symbol} {interval}: stored {len(bars)} bars from {bars.index[0]:%Y-%m-%d}")
+    return frame_store.upsert_frame(name, bars)
+
+
+async def load_history(symbol: str, interval: str = "1d") -> pd.DataFrame | None:
+    """
+    Full stored history of one symbol/interval, synced with Yahoo first when stale.
+    When the sync fails the stored frame is served as-is; with nothing stored the
+    error propagates.
+    """
+    name = _name(symbol, interval)
+    age = frame_store.frame_age(name)
+    if age is not None and age < INTERVALS[interval][1]:
+        frame = _frames.get(name)
+        if frame is None:
+            frame = await asyncio.to_thread(frame_store.read_frame, name)
+            _frames.set(name, frame)
+        return frame
+
+    task = _syncs.get(name)
+    if task is None:
+        task = _syncs[name] = asyncio.create_task(guarded("yfinance", asyncio.to_thread, sync_history, symbol, interval))
+        task.add_done_callback(lambda _: _syncs.pop(name, None))
+    try:
+        frame = await asyncio.shield(task)
+    except Exception as e:
+        print(f"⚠️  History sync failed for {symbol} {interval}: {e}")
+        frame = await asyncio.to_thread(frame_store.read_frame, name)
+        if frame is None:
+            raise
+    if frame is not None:
+        _frames.set(name, frame)
+    return frame
+
+
+async def get_history(symbol: str, interval: str = "1d", start: date | None = None, end: date | None = None,
+                      points: int = 500, method: str = "lttb") -> dict | None:
+    """
+    Bars of `symbol` between start and end as columns, downsampled to about
+    `points` rows (0 = all): "lttb" keeps the most shape-relevant bars by close,
+    "ohlc" merges neighbouring bars into wider candles. None when Yahoo has no data.
+    """
+    frame = await load_history(symbol.upper(), interval)
+    if frame is None or frame.empty:
+        return None
+    # end is inclusive for the whole day (matters for intraday bars)
+    lower = pd.Timestamp(start) if start else None
+    upper = pd.Timestamp(end) + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1) if end else None
+    frame = frame.loc[lower:upper]
+
+    index = frame.index
+    values = {c: frame[c].to_numpy() for c in COLUMNS}
+    original = len(frame)
+    if points and original > points:
+        if method == "ohlc":
+            starts, *aggregated = ohlc_buckets(*(values[c] for c in COLUMNS), buckets=points)
+            index, values = index[starts], dict(zip(COLUMNS, aggregated))
+        else:
+            x = index.asi8.astype("float64")
+            keep = lttb(x, values["close"], points)
+            index, values = index[keep], {c: v[keep] for c, v in values.items()}
+
+    fmt = "%Y-%m-%dT%H:%M:%S" if interval == "1h" else "%Y-%m-%d"
+    return {
+        "symbol": symbol.upper(),
+        "interval": interval,
+        "points": len(index),
+        "total_points": original,
+        "dates": index.strftime(fmt).tolist(),
+        **{c: np.round(v, 4).tolist() for c, v in values.items()},
+    }
@@ -0,0 +1,67 @@
+import asyncio
+import random
+import time
+
+from app.core.article_store import query_many
+from app.core.live import LIVE_POLL_INTERVAL, register_feed
+from app.core.ratelimit import PROVIDER_LIMITS
+from app.integrations.financials import FINNHUB, FINNHUB_KEY, safe_get
+from app.integrations.news import ensure_synced
+
+LIVE_NEWS_ITEMS = 5  # newest articles pushed per symbol
+QUOTE_FIELDS = {"c": "price", "d": "change", "dp": "changePct", "h": "high", "l": "low", "o": "open", "pc": "prevClose"}
+
+# Finnhub /quote takes one symbol per call, so live quotes get a fixed share of the
+# finnhub refill rate: FINNHUB_BATCH symbols per poll, rotating through the watched
+# set, which is capped so every quote is refreshed at least every LIVE_MAX_ROUNDS polls.
+LIVE_QUOTE_SHARE = 0.5  # rest of the finnhub budget is left to regular requests
+LIVE_MAX_ROUNDS = 4     # 4 × 15s polls: quotes at most a minute old
+FINNHUB_BATCH = max(1, int(PROVIDER_LIMITS["finnhub"][1] * LIVE_POLL_INTERVAL * LIVE_QUOTE_SHARE))
+
+
+# =====================================================================
+# 🧩 Finnhub polling feed (default)
+# =====================================================================
+async def poll_finnhub(symbols: list[str]) -> list[dict]:
+    """Latest Finnhub quote plus the newest stored articles for this pass's symbols."""
+    events = []
+
+    if FINNHUB_KEY:
+        quotes = await asyncio.gather(*(
+            safe_get(f"{FINNHUB}/quote", {"symbol": s, "token": FINNHUB_KEY}, f"Live quote {s}") for s in symbols
+        ))
+        for symbol, quote in zip(symbols, quotes):
+            if quote and quote.get("t"):
+                data = {name: quote.get(field) for field, name in QUOTE_FIELDS.items()}
+                events.append({"type": "quote", "symbol": symbol, "data": {**data, "time": quote["t"]}})
+
+    # News comes from the article store, which only tops up what is new since its last sync
+    await ensure_synced(symbols, days=1)
+    latest = await query_many(symbols, since=time.time() - 86400, limit=LIVE_NEWS_ITEMS)
+    for symbol, articles in latest.items():
+        if articles:
+            events.append({"type": "news", "symbol": symbol, "data": articles})
+    return events
+
+
+# =====================================================================
+# 🧩 Local stub feed (LIVE_FEED=stub) — random-walk quotes, no upstream calls
+# =====================================================================
+_stub_prices: dict[str, float] = {}
+
+
+async def poll_stub(symbols: list[str]) -> list[dict]:
+    events = []
+    for symbol in symbols:
+        previous = _stub_prices.get(symbol, 100.0)
+        price = _stub_prices[symbol] = round(previous * (1 + random.gauss(0, 0.002)), 2)
+        events.append({
+            "type": "quote",
+            "symbol": symbol,
+            "data": {"price": price, "change": round(price - previous, 2), "time": int(time.time())},
+        })
+    return events
+
+
+register_feed("finnhub", poll_finnhub, batch_size=FINNHUB_BATCH, max_symbols=FINNHUB_BATCH * LIVE_MAX_ROUNDS)
+register_feed("stub", poll_stub)
@@ -1,13 +1,200 @@
+import asyncio
 import csv
+import io
 
+import pandas as pd
 import yfinance as yf
-from app.schemas.portfolio import StockInput, PortfolioItem, PortfolioResponse
-
-def compute_manual_portfolio(stocks: list[StockInput]) -> PortfolioResponse:
-  total = 0
-  assets = []
-  
-  for stock in stocks:
-    ticker = yf.Ticker(stock.symbol)
-    hist = ticker.history(period="1d")
-    
\ No newline at end of file
+from pydantic import TypeAdapter, ValidationError
+
+from app.core.cache import CacheManager
+from app.core.circuit import guarded
+from app.schemas.portfolio import StockInput, PortfolioItem, PortfolioResponse, PortfolioImportResponse
+
+PRICE_LOOKBACK = "5d"  # enough daily bars to find a last close over weekends/holidays
+
+# --- CSV import ---
+IMPORT_BATCH_ROWS = 5000   # rows validated per pydantic batch
+IMPORT_MAX_ERRORS = 20     # row errors reported back (all are counted)
+# Header aliases used by common broker exports (matched case-insensitively)
+SYMBOL_COLUMNS = ("symbol", "ticker", "instrument", "code")
+SHARES_COLUMNS = ("shares", "quantity", "qty", "no. of shares", "units", "position")
+ACTION_COLUMNS = ("action", "side", "type")
+
+_stock_rows = TypeAdapter(list[StockInput])
+
+
+# =====================================================================
+# 🧩 Prices — one batched yf.download for every uncached symbol
+# =====================================================================
+def download_prices(symbols: list[str]) -> dict[str, float | None]:
+    """Last close per symbol from a single yf.download call (blocking; run in a thread)."""
+    data = yf.download(
+        tickers=symbols, period=PRICE_LOOKBACK, interval="1d",
+        group_by="column", auto_adjust=False, progress=False, threads=True,
+    )
+    if data is None or data.empty:
+        return {symbol: None for symbol in symbols}
+
+    close = data["Close"]
+    if isinstance(close, pd.Series):  # a single ticker comes back without the symbol level
+        close = close.to_frame(symbols[0])
+    last = close.ffill().iloc[-1].reindex(symbols)
+    return {symbol: float(price) if pd.notna(price) else None for symbol, price in last.items()}
+
+
+async def fetch_prices(symbols: list[str]) -> dict[str, float | None]:
+    """
+    symbol -> latest price (None when Yahoo has none). Cached prices come from one
+    MGET; all misses are priced with a single batched download and cached together.
+    """
+    keys = [CacheManager.make_key("prices", s) for s in symbols]
+    prices = dict(zip(symbols, await CacheManager.get_many(keys, refresh=_refresh_prices)))
+    misses = [s for s, price in prices.items() if price is None]
+
+    if misses:
+        print(f"💹 Pricing {len(misses)}/{len(symbols)} symbols with one yf.download...")
+        prices.update(await price_and_cache(misses))
+    return prices
+
+
+async def price_and_cache(symbols: list[str]) -> dict[str, float | None]:
+    """Downloads prices for `symbols` in one call and caches the ones Yahoo returned."""
+    fresh = await guarded("yfinance", asyncio.to_thread, download_prices, symbols)
+    await CacheManager.set_many({
+        CacheManager.make_key("prices", s): price for s, price in fresh.items() if price is not None
+    })
+    return fresh
+
+
+async def _refresh_prices(keys: list[str]):
+    """get_many refresh hook: re-prices all stale symbols with one download."""
+    await price_and_cache([CacheManager.split_key(key)[1] for key in keys])
+
+
+# =====================================================================
+# 🧩 Valuation
+# =====================================================================
+def value_holdings(shares: pd.Series, prices: dict[str, float | None]) -> PortfolioResponse:
+    """Vectorized value and weight per symbol from aggregated `shares` (indexed by symbol)."""
+    price = pd.Series(prices, dtype="float64").reindex(shares.index)
+    priced = price.notna()
+
+    frame = pd.DataFrame({"shares": shares[priced], "current_price": price[priced]})
+    frame["value"] = frame["shares"] * frame["current_price"]
+    total = float(frame["value"].sum())
+    frame["weight"] = frame["value"] / total if total else 0.0
+    frame = frame.sort_values("value", ascending=False).round({"value": 2, "weight": 6})
+
+    return PortfolioResponse(
+        total_value=round(total, 2),
+        assets=[PortfolioItem(symbol=symbol, **row) for symbol, row in frame.to_dict("index").items()],
+        unpriced=shares.index[~priced].tolist(),
+    )
+
+
+def aggregate_shares(stocks: list[StockInput]) -> pd.Series:
+    """Total shares per normalized symbol (duplicate lines are summed)."""
+    frame = pd.DataFrame({"symbol": [s.symbol for s in stocks], "shares": [s.shares for s in stocks]})
+    frame["symbol"] = frame["symbol"].str.strip().str.upper()
+    return frame[frame["symbol"] != ""].groupby("symbol", sort=False)["shares"].sum()
+
+
+async def value_shares(shares: pd.Series) -> PortfolioResponse:
+    prices = await fetch_prices(shares.index.tolist())
+    return value_holdings(shares, prices)
+
+
+async def compute_manual_portfolio(stocks: list[StockInput]) -> PortfolioResponse:
+    """
+    Values a manually entered portfolio: duplicate symbols are merged, all
+    symbols are priced in one upstream round trip, and value / weight are
+    computed column-wise. Symbols without a price are listed in `unpriced`.
+    """
+    shares = aggregate_shares(stocks)
+    if shares.empty:
+        return PortfolioResponse(total_value=0.0, assets=[])
+    return await value_shares(shares)
+
+
+# =====================================================================
+# 🧩 CSV import — streamed, validated in batches, aggregated per symbol
+# =====================================================================
+def _find_column(header: list[str], aliases: tuple[str, ...]) -> int | None:
+    normalized = [h.strip().lower() for h in header]
+    for alias in aliases:
+        if alias in normalized:
+            return normalized.index(alias)
+    return None
+
+
+def parse_holdings_csv(binary_file) -> tuple[pd.Series, dict]:
+    """
+    Reads a broker CSV export line by line (constant memory) and returns
+    (net shares per symbol, stats). Rows are validated into StockInput in
+    batches of IMPORT_BATCH_ROWS; rows whose action says "sell" count negative.
+    Raises ValueError when the header has no recognizable symbol / shares column.
+    Blocking; run in a thread.
+    """
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", errors="replace", newline="")
+    reader = csv.reader(text)
+    header = next(reader, None) or []
+    symbol_col, shares_col = _find_column(header, SYMBOL_COLUMNS), _find_column(header, SHARES_COLUMNS)
+    action_col = _find_column(header, ACTION_COLUMNS)
+    if symbol_col is None or shares_col is None:
+        raise ValueError(f"CSV header needs a symbol and a shares column, got {header}")
+
+    totals: dict[str, float] = {}
+    stats = {"rows": 0, "invalid_rows": 0, "errors": []}
+    batch, lines = [], []
+
+    def flush():
+        try:
+            rows = _stock_rows.validate_python(batch)
+            valid = zip(rows, lines)
+        except ValidationError:
+            # re-validate one by one only for the failing batch, to keep the good rows
+            valid = []
+            for raw, line in zip(batch, lines):
+                try:
+                    valid.append((StockInput.model_validate(raw), line))
+                except ValidationError as row_error:
+                    stats["invalid_rows"] += 1
+                    if len(stats["errors"]) < IMPORT_MAX_ERRORS:
+                        stats["errors"].append(f"line {line}: {row_error.errors()[0]['msg']}")
+        for stock, line in valid:
+            symbol = stock.symbol.strip().upper()
+            if symbol:
+                totals[symbol] = totals.get(symbol, 0.0) + stock.shares
+        batch.clear()
+        lines.clear()
+
+    width = max(symbol_col, shares_col, action_col or 0) + 1
+    for line, row in enumerate(reader, start=2):
+        if not row or not any(row):
+            continue
+        stats["rows"] += 1
+        if len(row) < width:
+            stats["invalid_rows"] += 1
+            if len(stats["errors"]) < IMPORT_MAX_ERRORS:
+                stats["errors"].append(f"line {line}: expected at least {width} columns")
+            continue
+        shares = row[shares_col].strip().replace(",", "")
+        if action_col is not None and "sell" in row[action_col].lower() and shares:
+            shares = f"-{shares.lstrip('+-')}"  # sells count negative whether or not the export signs them
+        batch.append({"symbol": row[symbol_col], "shares": shares})
+        lines.append(line)
+        if len(batch) >= IMPORT_BATCH_ROWS:
+            flush()
+    if batch:
+        flush()
+
+    shares = pd.Series(totals, dtype="float64")
+    return shares[shares > 0], stats
+
+
+async def import_portfolio_csv(binary_file) -> PortfolioImportResponse:
+    """Parses an uploaded CSV off the event loop, then values the net positions in one pricing pass."""
+    shares, stats = await asyncio.to_thread(parse_holdings_csv, binary_file)
+    print(f"📥 Imported {stats['rows']} rows → {len(shares)} positions ({stats['invalid_rows']} invalid)")
+    valued = await value_shares(shares) if not shares.empty else PortfolioResponse(total_value=0.0, assets=[])
+    return PortfolioImportResponse(**valued.model_dump(), **stats)
@@ -1,139 +1,265 @@
 import os
 import json
+import math
+import heapq
+import base64
+import asyncio
+import time
 import datetime
-from app.core.cache import CacheManager
-import yfinance as yf
-import finnhub
+import orjson
+from app.core import article_store
+from app.core.http import http_get
 from dotenv import load_dotenv, find_dotenv
 from fastapi.encoders import jsonable_encoder
-from app.utils.news_util import tickers_to_concept_uris
+from app.utils.payload_util import headline_hash
 
 
 # --- Load API keys ---
 load_dotenv(find_dotenv())
 FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY")  # match .env key name exactly
-finnhub_client = finnhub.Client(
-    api_key=FINNHUB_API_KEY)
+FINNHUB = "https://finnhub.io/api/v1"
 
-def get_news(symbol: str, days: int = 3, max_items: int = 8, output_file: str | None = None):
-    """"
-    Fetch recent company news from Finnhub for a given symbol.
-    Uses Redis caching to avoid redundant API calls.
-    Optionally saves results to a JSON file.
+NEWS_CONCURRENCY = 8  # symbols synced at once by multi-symbol requests
+NEWS_SYNC_INTERVAL = 900  # seconds before a symbol's article store is topped up again
+FEED_MIN_PAGE = 4    # per-symbol page bounds for the mixed feed merge
+FEED_MAX_PAGE = 50
+
+_syncs: dict[tuple[str, int], asyncio.Task] = {}
+
+
+async def fetch_company_news(symbol: str, date_start: str, date_end: str) -> list:
+    """Finnhub /company-news through the shared pooled HTTP client."""
+    r = await http_get(f"{FINNHUB}/company-news",
+                 params={"symbol": symbol, "from": date_start, "to": date_end, "token": FINNHUB_API_KEY})
+    r.raise_for_status()
+    return r.json()
+
+
+def _window_start(days: int) -> datetime.date:
+    return datetime.date.today() - datetime.timedelta(days=min(days, article_store.RETENTION_DAYS))
+
+
+async def sync_symbol(symbol: str, days: int, state: dict | None):
+    """
+    Brings the symbol's article store up to date for a `days` window.
+    Only the span since the last sync is fetched, unless the window reaches
+    further back than anything stored so far (then the whole window is fetched once).
     """
+    window_start = _window_start(days)
+    covered = state is not None and state["covered_from"] <= window_start.isoformat()
+    now = time.time()
+    if covered and now - state["synced_at"] < NEWS_SYNC_INTERVAL:
+        return
 
-    cache_key = CacheManager.make_key("news", f"{symbol}_{days}d")
+    date_from = datetime.date.fromtimestamp(state["synced_at"]) if covered else window_start
+    articles = await fetch_company_news(symbol, date_from.isoformat(), datetime.date.today().isoformat())
 
-    # Try to load from cache
-    if cached := CacheManager.get(cache_key):
-        return json.loads(cached)
+    retention_start = datetime.date.today() - datetime.timedelta(days=article_store.RETENTION_DAYS)
+    covered_from = max(state["covered_from"] if covered else window_start.isoformat(), retention_start.isoformat())
+    added = await article_store.add_articles(
+        symbol, articles or [], covered_from=covered_from, synced_at=now,
+        trim_before=datetime.datetime.combine(retention_start, datetime.time()).timestamp(),
+    )
+    print(f"📰 {symbol}: synced {date_from} → today, {added} new articles")
 
-    # Otherwise fetch fresh data
-    date_start = (datetime.date.today() - datetime.timedelta(days=days)).isoformat()
-    date_end = datetime.date.today().isoformat()
 
-    articles = finnhub_client.company_news(symbol, _from=date_start, to=date_end)
+async def _sync_once(symbol: str, days: int, state: dict | None):
+    """In-process single flight: concurrent requests for a symbol share one sync."""
+    flight = (symbol, days)
+    task = _syncs.get(flight)
+    if task is None:
+        task = _syncs[flight] = asyncio.create_task(sync_symbol(symbol, days, state))
+        task.add_done_callback(lambda _: _syncs.pop(flight, None))
+    await asyncio.shield(task)
 
-    if max_items:
-        articles = articles[:max_items]
 
-    # Cache the new data
-    CacheManager.set(cache_key, json.dumps(articles))
+async def ensure_synced(symbols: list[str], days: int):
+    """
+    Syncs every symbol whose article store is stale or does not reach back `days`
+    days, NEWS_CONCURRENCY at a time. A failed sync is logged; the symbol is then
+    served from whatever the store already holds.
+    """
+    states = await article_store.get_states(symbols)
+    semaphore = asyncio.Semaphore(NEWS_CONCURRENCY)
+
+    async def sync(symbol: str, state: dict | None):
+        async with semaphore:
+            try:
+                await _sync_once(symbol, days, state)
+            except Exception as e:
+                print(f"⚠️  News sync failed for {symbol}: {e}")
+
+    await asyncio.gather(*(sync(s, state) for s, state in zip(symbols, states)))
+
+
+def _since(days: int) -> float:
+    return datetime.datetime.combine(_window_start(days), datetime.time()).timestamp()
+
+
+async def fetch_symbols_news(symbols: list[str], days: int, max_items: int | None = None) -> dict:
+    """
+    symbol -> articles from the last `days` days, newest first (at most max_items each),
+    answered from the article store after syncing the symbols that need it.
+    """
+    await ensure_synced(symbols, days)
+    return await article_store.query_many(symbols, since=_since(days), limit=max_items or None)
+
+
+def parse_symbols(symbols) -> list[str]:
+    """Comma-separated string or list -> unique upper-case symbols, order kept."""
+    if isinstance(symbols, str):
+        symbols = symbols.split(",")
+    return list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+
+
+async def get_news(symbol: str, days: int = 3, max_items: int = 8, output_file: str | None = None):
+    """"
+    Fetch recent company news from Finnhub for a given symbol, newest first.
+    Served from the per-symbol article store, which only fetches what is new since its last sync.
+    Optionally saves results to a JSON file.
+    """
+
+    symbol = symbol.upper()
+    articles = (await fetch_symbols_news([symbol], days, max_items))[symbol]
 
     # Optionally save to file
     if output_file:
         with open(output_file, "w", encoding="utf-8") as f:
             json.dump(articles, f, ensure_ascii=False, indent=2)
         print(f"✅ Saved {len(articles)} articles for {symbol} → {output_file}")
-        print(">>> RAW RESPONSE:", symbol, articles[:2])
 
     return articles
 
 
+async def get_news_grouped(symbols, max_items: int = 50, days: int = 30, output_file: str | None = None):
+    """
+    Returns {symbol: articles} for every symbol (at most max_items each, newest first).
+    Built from the per-symbol article stores, so overlapping watchlists share fetches.
+    """
+    return await fetch_symbols_news(parse_symbols(symbols), days, max_items)
 
-def get_news_grouped(symbols, max_items: int = 50, days: int = 30, output_file: str | None = None):
-    if isinstance(symbols, str):
-        symbols_list = [s.strip().upper() for s in symbols.split(",")]
-    else:
-        symbols_list = [s.strip().upper() for s in symbols]
-
-    # normalize and make a stable cache key
-    symbols_list.sort()
-    symbols_str = "-".join(symbols_list)
-    cache_key = CacheManager.make_key("news", f"{symbols_str}_{days}d")
-    
-    if cached := CacheManager.get(cache_key):
-        return json.loads(cached)
-    
-    date_start = (datetime.date.today() -
-                  datetime.timedelta(days=days)).isoformat()
-    date_end = datetime.date.today().isoformat()
 
-    if isinstance(symbols, str):
-        symbols = [s.strip().upper() for s in symbols.split(",")]
+# =====================================================================
+# 🧩 Mixed feed: k-way merge of the per-symbol article stores
+# =====================================================================
+class _Desc(str):
+    """Reverses string order so heapq pops the largest article id first."""
 
-    grouped = {}
+    def __lt__(self, other):
+        return str.__gt__(self, other)
 
-    for symbol in symbols:
-        articles = finnhub_client.company_news(
-            symbol, _from=date_start, to=date_end)
-        print(f"{symbol}: {len(articles)} articles")
-        print(f"{symbol}: type={type(articles)}, sample={articles[:1]}")
 
-        if max_items:
-            articles = articles[:max_items]
+def encode_cursor(datetime_: float, doc_id: str, seen: set[str]) -> str:
+    raw = orjson.dumps({"t": datetime_, "id": doc_id, "seen": sorted(seen)})
+    return base64.urlsafe_b64encode(raw).decode()
 
-        grouped[symbol] = articles
-        
-    # Cache the new data
-    CacheManager.set(cache_key, json.dumps(grouped))
 
-    # print(grouped)
-    return grouped
+def decode_cursor(cursor: str) -> dict:
+    """Raises ValueError for anything that is not a cursor we issued."""
+    try:
+        data = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return {"t": float(data["t"]), "id": str(data["id"]), "seen": set(data["seen"])}
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
 
 
-def get_news_mixed(symbols, max_items: int = 10, days: int = 3, output_file: str | None = None):
+async def merge_feeds(symbols: list[str], since: float, limit: int, cursor: dict | None = None):
     """
-    Returns a combined list of articles across ALL symbols.
-    Optionally saves results to a JSON file if output_file is provided.
+    Newest-first k-way merge over the per-symbol article streams.
+    Each stream is read lazily a page at a time, and the merge stops as soon as
+    `limit` unique articles (by id, URL and headline) have been taken.
+    Returns (articles, next_cursor or None).
     """
-    
-    if isinstance(symbols, str):
-        symbols_list = [s.strip().upper() for s in symbols.split(",")]
-    else:
-        symbols_list = [s.strip().upper() for s in symbols]
-
-    # normalize and make a stable cache key
-    symbols_list.sort()
-    symbols_str = "-".join(symbols_list)
-    cache_key = CacheManager.make_key("news", f"{symbols_str}_{days}d")
-    
-    if cached := CacheManager.get(cache_key):
-        return json.loads(cached)
-    
-    date_start = (datetime.date.today() -
-                  datetime.timedelta(days=days)).isoformat()
-    date_end = datetime.date.today().isoformat()
+    page_size = min(FEED_MAX_PAGE, max(FEED_MIN_PAGE, math.ceil(2 * limit / max(len(symbols), 1))))
+    until = cursor["t"] if cursor else "+inf"
+    offsets = [0] * len(symbols)
+    buffers = [[] for _ in symbols]
+    exhausted = [False] * len(symbols)
 
-    if isinstance(symbols, str):
-        symbols = [s.strip().upper() for s in symbols.split(",")]
+    async def refill(indexes: list[int]):
+        pages = await article_store.read_pages(
+            [(symbols[i], until, since, offsets[i], page_size) for i in indexes]
+        )
+        for i, page in zip(indexes, pages):
+            offsets[i] += len(page)
+            exhausted[i] = len(page) < page_size
+            if cursor:  # drop what earlier pages already covered (same second, id at or above the cursor)
+                page = [e for e in page if not (e[1] == cursor["t"] and e[0] >= cursor["id"])]
+            buffers[i] = page[::-1]  # pop() from the end = newest first
+
+    heap = []
 
-    mixed_articles = []
+    async def advance(indexes: list[int]):
+        empty = [i for i in indexes if not buffers[i] and not exhausted[i]]
+        if empty:
+            await refill(empty)
+        for i in indexes:
+            if buffers[i]:
+                doc_id, score, _ = buffers[i][-1]
+                heapq.heappush(heap, (-score, _Desc(doc_id), i))
+            elif not exhausted[i]:
+                await advance([i])  # a whole page was filtered out by the cursor
 
-    for symbol in symbols:
-        articles = finnhub_client.company_news(
-            symbol, _from=date_start, to=date_end)
-        if max_items:
-            articles = articles[:max_items]
-        mixed_articles.extend(articles)
+    await advance(list(range(len(symbols))))
 
-    mixed_articles.sort(key=lambda x: x['datetime'])
-    
-    CacheManager.set(cache_key, json.dumps(mixed_articles))
+    articles, seen_ids, seen_keys = [], set(), set()
+    emitted_at = {}  # dedup keys of the emitted articles at the current timestamp
+    last = None
+    while heap and len(articles) < limit:
+        _, _, i = heapq.heappop(heap)
+        doc_id, score, article = buffers[i].pop()
+        await advance([i])
+        last = (score, doc_id)
+        if last[0] not in emitted_at:
+            emitted_at = {score: set()}
+        if article is None:
+            continue
+
+        keys = {article.get("url"), headline_hash(article.get("headline"))} - {None}
+        if cursor and score == cursor["t"] and keys & cursor["seen"]:
+            continue  # already on the previous page
+        if doc_id in seen_ids or keys & seen_keys:
+            continue
+        seen_ids.add(doc_id)
+        seen_keys |= keys
+        emitted_at[score] |= keys
+        articles.append(article)
+
+    next_cursor = None
+    if heap and last is not None:
+        carried = cursor["seen"] if cursor and cursor["t"] == last[0] else set()
+        next_cursor = encode_cursor(last[0], last[1], carried | emitted_at[last[0]])
+    return articles, next_cursor
+
+
+async def get_news_mixed_page(symbols, max_items: int = 10, days: int = 3, output_file: str | None = None,
+                              cursor: str | None = None) -> dict:
+    """
+    Returns one page of a combined, newest-first feed across ALL symbols:
+    {"articles": [...], "next_cursor": str | None}. Stories tagged with several
+    symbols appear once; max_items applies to the whole page. Pass next_cursor
+    back as `cursor` for the following page.
+    Optionally saves the page to a JSON file if output_file is provided.
+    """
+    symbols_list = parse_symbols(symbols)
+    position = decode_cursor(cursor) if cursor else None
+
+    await ensure_synced(symbols_list, days)
+    mixed_articles, next_cursor = await merge_feeds(symbols_list, _since(days), max_items or FEED_MAX_PAGE, position)
 
     if output_file:
         with open(output_file, "w", encoding="utf-8") as f:
             json.dump(mixed_articles, f, ensure_ascii=False, indent=2)
         print(f"✅ Saved {len(mixed_articles)} articles → {output_file}")
 
-    return mixed_articles
+    return {"articles": mixed_articles, "next_cursor": next_cursor}
+
+
+async def get_news_mixed(symbols, max_items: int = 10, days: int = 3, output_file: str | None = None) -> list:
+    """
+    Returns a combined list of articles across ALL symbols (the first page of
+    get_news_mixed_page: newest first, deduplicated, max_items in total).
+    Optionally saves results to a JSON file if output_file is provided.
+    """
+    page = await get_news_mixed_page(symbols, max_items=max_items, days=days, output_file=output_file)
+    return page["articles"]
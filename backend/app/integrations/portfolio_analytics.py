@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+
+import numpy as np
+import orjson
+import pandas as pd
+
+from app.core.cache import CacheManager
+from app.integrations.economics import get_fred_series
+from app.integrations.history import load_history
+from app.integrations.manual import aggregate_shares
+from app.schemas.portfolio import StockInput, PortfolioAnalyticsResponse
+
+# window -> calendar days of daily bars analysed
+ANALYTICS_WINDOWS = {"3mo": 91, "6mo": 182, "1y": 365, "3y": 365 * 3, "5y": 365 * 5}
+ANALYTICS_MAX_SYMBOLS = 1000  # matches the request schema; ~0.3s of NumPy for 1000 symbols × 5y
+HISTORY_CONCURRENCY = 8       # symbol histories loaded at once
+TRADING_DAYS = 252            # annualization factor for daily returns
+MIN_COVERAGE = 0.9            # symbols priced on fewer of the window's days are left out
+MAX_GAP_DAYS = 5              # prices carried over holidays of other exchanges
+MIN_OBSERVATIONS = 20         # daily returns needed for meaningful statistics
+BENCHMARK = "SP500"           # FRED code of the beta benchmark
+SPLIT_MIN_RATIO = 1.25        # split ratios closer to 1 (stock dividends) look like ordinary days; not rescaled
+
+
+def holdings_hash(shares: pd.Series) -> str:
+    """Order-independent hash of aggregated positions (symbol -> shares)."""
+    positions = sorted((symbol, round(float(n), 6)) for symbol, n in shares.items())
+    return hashlib.md5(orjson.dumps(positions)).hexdigest()
+
+
+async def fetch_portfolio_analytics(stocks: list[StockInput], window: str = "1y",
+                                    force_refresh: bool = False) -> dict:
+    """
+    Risk and return statistics for buy-and-hold of the current positions (long
+    and short) over `window`: return series, volatility, beta vs the S&P 500,
+    correlation matrix, max drawdown and 1-day historical VaR.
+    Cached per (holdings hash, window). Flat (zero) positions are listed in `missing`.
+    Raises ValueError for empty / oversized portfolios or too little shared history.
+    """
+    if window not in ANALYTICS_WINDOWS:
+        raise ValueError(f"window must be one of {list(ANALYTICS_WINDOWS)}")
+    shares = aggregate_shares(stocks)
+    if not (shares != 0).any():
+        raise ValueError("portfolio needs at least one non-zero position")
+    if len(shares) > ANALYTICS_MAX_SYMBOLS:
+        raise ValueError(f"analytics support up to {ANALYTICS_MAX_SYMBOLS} symbols, got {len(shares)}")
+
+    cache_key = CacheManager.make_key("analytics", f"{holdings_hash(shares)}_{window}")
+
+    async def compute():
+        closes, splits, benchmark = await load_prices(shares.index.tolist())
+        return compute_analytics(shares, closes, benchmark, window, splits).model_dump()
+
+    return await CacheManager.get_or_compute(cache_key, compute, force_refresh=force_refresh)
+
+
+async def load_prices(symbols: list[str]) -> tuple[pd.DataFrame, pd.DataFrame, pd.Series | None]:
+    """
+    Daily closes and split ratios per symbol (columns, union of dates) from the
+    history store plus the benchmark series; the benchmark is None when FRED is unavailable.
+    """
+    semaphore = asyncio.Semaphore(HISTORY_CONCURRENCY)
+
+    async def bars(symbol: str) -> pd.DataFrame | None:
+        async with semaphore:
+            try:
+                frame = await load_history(symbol, "1d")
+            except Exception as e:
+                print(f"⚠️  No history for {symbol}: {e}")
+                return None
+        return frame if frame is not None and not frame.empty else None
+
+    async def benchmark() -> pd.Series | None:
+        try:
+            return await get_fred_series(BENCHMARK)
+        except Exception as e:
+            print(f"⚠️  Benchmark {BENCHMARK} unavailable, beta skipped: {e}")
+            return None
+
+    *frames, bench = await asyncio.gather(*(bars(s) for s in symbols), benchmark())
+    frames = {symbol: f for symbol, f in zip(symbols, frames) if f is not None}
+    if not frames:
+        return pd.DataFrame(), pd.DataFrame(), bench
+    closes = pd.concat({symbol: f["close"] for symbol, f in frames.items()}, axis=1)
+    # frames stored before split ratios were kept have no "splits" column
+    splits = pd.concat({symbol: f.get("splits", pd.Series(0.0, index=f.index)) for symbol, f in frames.items()},
+                       axis=1)
+    return closes, splits, bench
+
+
+def _unsplit(closes: pd.DataFrame, splits: pd.DataFrame | None) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Rescales closes before a split day when the stored history still jumps by the
+    split ratio there (the store was not rebased), so a 2:1 split does not read as
+    a -50% day. A split day counts as unadjusted only when its close ratio is
+    nearer (in log terms) to 1/split than to 1; ratios within SPLIT_MIN_RATIO of 1
+    are skipped because a normal day's move cannot be told apart from them.
+    Returns the closes and the symbols that were rescaled.
+    """
+    if splits is None or splits.empty:
+        return closes, []
+    closes, adjusted = closes.copy(), []
+    for symbol in splits.columns.intersection(closes.columns):
+        events = splits[symbol].reindex(closes.index)
+        events = events[(events > 0) & (np.abs(np.log(events.where(events > 0))) >= np.log(SPLIT_MIN_RATIO))]
+        for day, ratio in events.items():
+            prices = closes[symbol]
+            before = prices.loc[:day].iloc[:-1].last_valid_index()
+            if before is None or pd.isna(prices.at[day]):
+                continue
+            jump = np.log(prices.at[day] / prices.at[before])
+            if abs(jump + np.log(ratio)) < abs(jump):
+                closes.loc[:before, symbol] /= ratio
+                adjusted.append(symbol)
+    return closes, list(dict.fromkeys(adjusted))
+
+
+def _betas(returns: np.ndarray, bench: np.ndarray) -> np.ndarray | None:
+    """Beta of every column of `returns` against `bench` over rows where both are known."""
+    known = np.isfinite(bench)
+    if known.sum() < MIN_OBSERVATIONS:
+        return None
+    x, b = returns[known], bench[known]
+    x, b = x - x.mean(axis=0), b - b.mean()
+    return (x.T @ b) / (b @ b)
+
+
+def _drawdowns(values: np.ndarray) -> np.ndarray:
+    """Max drawdown of each column of a value / price matrix (negative fractions)."""
+    return (values / np.maximum.accumulate(values, axis=0) - 1).min(axis=0)
+
+
+def compute_analytics(shares: pd.Series, closes: pd.DataFrame, benchmark: pd.Series | None,
+                      window: str, splits: pd.DataFrame | None = None) -> PortfolioAnalyticsResponse:
+    """
+    All statistics from one aligned price matrix P (days × symbols). Shares may be
+    negative (shorts): the portfolio's daily return is its P&L, diff(P @ shares),
+    over the previous day's gross exposure |P| @ |shares|, which for a long-only
+    book equals the plain value return. Per-asset figures are column-wise NumPy
+    reductions over the same arrays. Split-sized jumps left in unadjusted
+    history are rescaled first (see _unsplit) and reported in `split_adjusted`.
+    """
+    flat = shares.index[shares == 0].tolist()
+    shares = shares[shares != 0]
+    closes = closes.reindex(columns=[s for s in shares.index if s in closes.columns])
+    if closes.empty:
+        raise ValueError("no price history for any holding")
+    cutoff = closes.index[-1] - pd.Timedelta(days=ANALYTICS_WINDOWS[window])
+    closes, split_adjusted = _unsplit(closes[closes.index >= cutoff], splits)
+
+    coverage = closes.notna().mean()
+    covered = coverage.index[coverage >= MIN_COVERAGE]
+    missing = flat + [s for s in shares.index if s not in covered]
+    closes = closes[covered].ffill(limit=MAX_GAP_DAYS).dropna()
+    if len(closes) <= MIN_OBSERVATIONS:
+        raise ValueError(f"not enough shared price history in {window} for these holdings")
+
+    symbols = closes.columns.tolist()
+    prices = closes.to_numpy()                               # T × N
+    held = shares.reindex(symbols).to_numpy()                # N, signed
+    gross = prices @ np.abs(held)                            # T, gross exposure
+    returns = prices[1:] / prices[:-1] - 1                   # (T-1) × N
+    port = np.diff(prices @ held) / gross[:-1]               # T-1, P&L / gross exposure
+    equity = np.append(1.0, np.cumprod(1 + port))            # T, growth of 1 unit of exposure
+    weights = prices[-1] * held / gross[-1]                  # signed, sum(|w|) = 1
+    both = np.column_stack([returns, port])                  # assets + portfolio side by side
+
+    volatility = both.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+    total = np.append(prices[-1] / prices[0], equity[-1]) - 1
+    drawdown = _drawdowns(np.column_stack([prices, equity]))
+    betas = None
+    if benchmark is not None and not benchmark.empty:
+        bench = benchmark.reindex(closes.index.union(benchmark.index)).ffill(limit=MAX_GAP_DAYS)
+        bench = bench.reindex(closes.index).to_numpy()
+        betas = _betas(both, bench[1:] / bench[:-1] - 1)
+    var_95, var_99 = -np.percentile(port, [5, 1])
+    correlation = np.nan_to_num(np.corrcoef(returns, rowvar=False).reshape(len(symbols), len(symbols)))
+
+    def num(x) -> float:
+        return round(float(x), 6)
+
+    return PortfolioAnalyticsResponse(
+        window=window,
+        start=closes.index[0].strftime("%Y-%m-%d"),
+        end=closes.index[-1].strftime("%Y-%m-%d"),
+        observations=len(port),
+        total_return=num(total[-1]),
+        volatility=num(volatility[-1]),
+        beta=num(betas[-1]) if betas is not None else None,
+        max_drawdown=num(drawdown[-1]),
+        var_95=num(var_95),
+        var_99=num(var_99),
+        var_95_value=round(float(var_95 * gross[-1]), 2),
+        returns={
+            "dates": closes.index.strftime("%Y-%m-%d").tolist(),
+            "cumulative_return": np.round(equity - 1, 6).tolist(),
+        },
+        correlation={"symbols": symbols, "matrix": np.round(correlation, 4).tolist()},
+        assets=sorted((
+            {
+                "symbol": symbol,
+                "weight": num(weights[i]),
+                "total_return": num(total[i]),
+                "volatility": num(volatility[i]),
+                "beta": num(betas[i]) if betas is not None else None,
+                "max_drawdown": num(drawdown[i]),
+            }
+            for i, symbol in enumerate(symbols)
+        ), key=lambda a: abs(a["weight"]), reverse=True),
+        missing=missing,
+        split_adjusted=[s for s in split_adjusted if s in symbols],
+    )
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import time
+
+import yfinance as yf
+from dotenv import load_dotenv, find_dotenv
+from eventregistry import EventRegistry
+
+from app.core.cache import PREFIX, r
+from app.core.circuit import CircuitOpenError, get_breaker, guarded
+from app.core.ratelimit import acquire
+from app.utils.concurrency_util import spawn
+from app.utils.symbols_util import map_exchange
+
+load_dotenv(find_dotenv())
+NEWS_API_KEY = os.getenv("EVENT_REGISTERY_API_KEY")
+er = EventRegistry(apiKey=NEWS_API_KEY, allowUseOfArchive=False)
+
+# --- Symbol metadata index: {PREFIX}:symbols:{SYMBOL} hash ---
+# fields: name, long_name, exchange, concept_uri ("" = unresolved), resolved_at
+SYMBOL_TTL = 86400 * 90          # resolved entries live long...
+SYMBOL_REFRESH_AFTER = 86400 * 30  # ...and are re-resolved in the background after this
+NEGATIVE_TTL = 86400             # symbols without a name/concept are retried after a day
+SYMBOL_CONCURRENCY = 8           # unknown symbols resolved at once
+
+_resolving: dict[str, asyncio.Task] = {}
+
+
+def _key(symbol: str) -> str:
+    return f"{PREFIX}:symbols:{symbol}"
+
+
+def _entry(symbol: str, entry: dict) -> dict:
+    """Stored hash fields (as str) -> metadata dict; empty fields become None / defaults."""
+    return {
+        "symbol": symbol,
+        "name": entry.get("name") or symbol,
+        "long_name": entry.get("long_name") or None,
+        "exchange": entry.get("exchange") or "UNKNOWN",
+        "concept_uri": entry.get("concept_uri") or None,
+        "resolved_at": float(entry.get("resolved_at", 0)),
+    }
+
+
+def _decode_entry(symbol: str, raw: dict) -> dict:
+    return _entry(symbol, {k.decode(): v.decode() for k, v in raw.items()})
+
+
+def lookup_symbol(symbol: str) -> dict:
+    """Names and exchange from Yahoo (blocking; run in a thread)."""
+    info = yf.Ticker(symbol).info or {}
+    # ✅ Always fallback to ticker symbol if no names
+    name = info.get("shortName") or info.get("longName") or info.get("displayName") or symbol
+    return {
+        "name": name,
+        "long_name": info.get("longName") or "",
+        "exchange": map_exchange(info),
+    }
+
+
+async def concept_uri(name: str) -> str | None:
+    """
+    EventRegistry concept URI for a company name. Every EventRegistry call in the
+    news path goes through here, so each one spends an "eventregistry" token
+    (not while the circuit is open).
+    """
+    if not get_breaker("eventregistry").is_available:
+        raise CircuitOpenError("eventregistry circuit is open")
+    await acquire("eventregistry")
+    uri = await guarded("eventregistry", asyncio.to_thread, er.getConceptUri, name)
+    if not uri:
+        print(f"⚠️ Could not resolve EventRegistry concept for '{name}'")
+    return uri
+
+
+async def resolve_symbol(symbol: str) -> dict:
+    """Resolves one symbol upstream and stores it (negative entries expire after NEGATIVE_TTL)."""
+    entry = await asyncio.to_thread(lookup_symbol, symbol)
+    entry["concept_uri"] = await concept_uri(entry["name"]) or ""
+    entry["resolved_at"] = time.time()
+
+    pipe = r.pipeline(transaction=False)
+    pipe.hset(_key(symbol), mapping=entry)
+    pipe.expire(_key(symbol), SYMBOL_TTL if entry["concept_uri"] else NEGATIVE_TTL)
+    await pipe.execute()
+    return _entry(symbol, entry)
+
+
+async def _resolve_once(symbol: str) -> dict:
+    """In-process single flight per symbol."""
+    task = _resolving.get(symbol)
+    if task is None:
+        task = _resolving[symbol] = asyncio.create_task(resolve_symbol(symbol))
+        task.add_done_callback(lambda _: _resolving.pop(symbol, None))
+    return await asyncio.shield(task)
+
+
+async def get_symbol_metadata(symbols: list[str]) -> dict[str, dict]:
+    """
+    symbol -> {"symbol", "name", "long_name", "exchange", "concept_uri", "resolved_at"}.
+    Known symbols are one pipelined read; unknown ones are resolved concurrently
+    (SYMBOL_CONCURRENCY at a time) and entries older than SYMBOL_REFRESH_AFTER
+    are served as-is while they re-resolve in the background.
+    Symbols that fail to resolve map to a bare entry (name = symbol, no concept).
+    """
+    pipe = r.pipeline(transaction=False)
+    for symbol in symbols:
+        pipe.hgetall(_key(symbol))
+    rows = await pipe.execute()
+
+    metadata, missing = {}, []
+    for symbol, raw in zip(symbols, rows):
+        if not raw:
+            missing.append(symbol)
+            continue
+        metadata[symbol] = entry = _decode_entry(symbol, raw)
+        if time.time() - entry["resolved_at"] > SYMBOL_REFRESH_AFTER and symbol not in _resolving:
+            spawn(_resolve_once(symbol))
+
+    if missing:
+        semaphore = asyncio.Semaphore(SYMBOL_CONCURRENCY)
+
+        async def resolve(symbol: str):
+            async with semaphore:
+                try:
+                    return await _resolve_once(symbol)
+                except Exception as e:
+                    print(f"⚠️  Symbol lookup failed for {symbol}: {e}")
+                    return _entry(symbol, {})
+
+        print(f"🔎 Resolving {len(missing)} unknown symbols...")
+        for entry in await asyncio.gather(*(resolve(s) for s in missing)):
+            metadata[entry["symbol"]] = entry
+
+    return {symbol: metadata[symbol] for symbol in symbols}
@@ -1,17 +1,41 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.routes import financials, news, analysis, econ_situation
+from app.core.cache import start_invalidation_listener, stop_invalidation_listener
+from app.core.http import close_clients
+from app.core.live import start_live, stop_live
+from app.core.warmer import start_warmer, stop_warmer
+from app.routes import financials, news, analysis, econ_situation, metrics, live, portfolio, history
 from rich.traceback import install
 
 # Make all tracebacks pretty in the console
 install(show_locals=True)
 
-app = FastAPI(title="Marketly Backend 🚀")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_invalidation_listener()
+    start_warmer()
+    start_live()
+    yield
+    stop_live()
+    stop_warmer()
+    stop_invalidation_listener()
+    # Release pooled upstream connections
+    await close_clients()
+
+
+app = FastAPI(title="Marketly Backend 🚀", lifespan=lifespan)
 
 # Include routers
 app.include_router(financials.router)
 app.include_router(news.router)
 app.include_router(analysis.router)
 app.include_router(econ_situation.router)
+app.include_router(metrics.router)
+app.include_router(live.router)
+app.include_router(portfolio.router)
+app.include_router(history.router)
 
 
 @app.get("/")
@@ -1,55 +1,190 @@
+import asyncio
+import json
+
 from fastapi import APIRouter, HTTPException
-from app.integrations.financials import fetch_stock_financials
+from fastapi.responses import StreamingResponse
+from app.integrations.financials import FETCH_DEADLINE, fetch_stock_financials
 from app.integrations.economics import fetch_macro_indicators
 from app.integrations.news import get_news
-from app.integrations.gpt import score_stock
+from app.integrations.gpt import score_stock, stream_score
+from app.integrations.gpt_batch import get_batch_results, poll_batch_job, submit_batch_scoring
+from app.schemas.analysis import ScoreBatchRequest
+from app.utils.concurrency_util import with_deadline
 
 router = APIRouter()
 
+# Per-source deadlines (seconds) for gathering /score inputs.
+# Financials are required; news and macro degrade to empty when late.
+FINANCIALS_DEADLINE = FETCH_DEADLINE + 2
+MACRO_DEADLINE = 8
+NEWS_DEADLINE = 5
+
+
+def score_input_sources(symbol: str) -> dict:
+    """name -> coroutine for every /score input, each wrapped in its own deadline."""
+    return {
+        "financials": with_deadline(fetch_stock_financials(symbol), FINANCIALS_DEADLINE, name=f"{symbol} financials"),
+        "macro": with_deadline(fetch_macro_indicators(), MACRO_DEADLINE, default={}, name="macro indicators"),
+        "news": with_deadline(get_news(symbol), NEWS_DEADLINE, default=[], name=f"{symbol} news"),
+    }
+
+
+async def gather_score_inputs(symbol: str) -> tuple[dict | None, dict, list]:
+    """
+    Fetch financials, macro and news concurrently, each under its own deadline.
+    Returns (financial_data, economical_data, news_data); financial_data is None
+    when it failed or was late, the optional sources fall back to empty.
+    """
+    sources = score_input_sources(symbol)
+    financial_data, economical_data, news_data = await asyncio.gather(
+        sources["financials"], sources["macro"], sources["news"]
+    )
+    return financial_data, economical_data, news_data
+
+
+def build_valuation(financial_data: dict) -> dict:
+    info = financial_data.get("info", {})
+    return {
+        "trailingPE": info.get("trailingPE"),
+        "forwardPE": info.get("forwardPE"),
+        "priceToBook": info.get("priceToBook"),
+        "priceToSales": info.get("priceToSalesTrailing12Months"),
+        "dividendYield": info.get("dividendYield"),
+        "marketCap": info.get("marketCap"),
+    }
+
+
+def build_score_response(symbol: str, analysis: dict, financial_data: dict) -> dict:
+    return {
+        "symbol": symbol,
+        "score": analysis.get("score"),
+        "summary": analysis.get("summary"),
+        "positives": analysis.get("positives", []),
+        "negatives": analysis.get("negatives", []),
+        "company": financial_data.get("info", {}).get("shortName"),
+        "valuation": build_valuation(financial_data),
+    }
+
+
+def sse(event: str, data) -> str:
+    """One Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 
 @router.get("/score/{symbol}")
-def stock_score(symbol: str):
+async def stock_score(symbol: str, refresh: bool = False):
     """
     Fetch financial, macro, and news data for a stock symbol,
     and generate an AI-based investment score.
+    Scores for unchanged inputs come from cache; refresh=true forces a new completion.
     """
 
     symbol = symbol.upper()
 
     try:
-        # --- Step 1: Fetch all raw data ---
-        financial_data = fetch_stock_financials(symbol)
+        # --- Step 1: Fetch all raw data (concurrently) ---
+        financial_data, economical_data, news_data = await gather_score_inputs(symbol)
+        if financial_data is None:
+            raise ValueError("financial data unavailable")
         if "error" in financial_data:
             raise ValueError(financial_data["error"])
 
-        economical_data = fetch_macro_indicators()
-        news_data = get_news(symbol)
-
         # --- Step 2: Score the stock with GPT ---
-        analysis = score_stock(financial_data, news_data, economical_data)
+        analysis = await score_stock(financial_data, news_data, economical_data, use_cache=not refresh)
         if "error" in analysis:
             raise ValueError(analysis["error"])
 
         # --- Step 3: Return structured response ---
-        return {
-            "symbol": symbol,
-            "score": analysis.get("score"),
-            "summary": analysis.get("summary"),
-            "positives": analysis.get("positives", []),
-            "negatives": analysis.get("negatives", []),
-            "company": financial_data.get("info", {}).get("shortName"),
-            "valuation": {
-                "trailingPE": financial_data["info"].get("trailingPE"),
-                "forwardPE": financial_data["info"].get("forwardPE"),
-                "priceToBook": financial_data["info"].get("priceToBook"),
-                "priceToSales": financial_data["info"].get("priceToSalesTrailing12Months"),
-                "dividendYield": financial_data["info"].get("dividendYield"),
-                "marketCap": financial_data["info"].get("marketCap"),
-            },
-        }
+        return build_score_response(symbol, analysis, financial_data)
 
     except ValueError as ve:
         raise HTTPException(status_code=502, detail=f"Data error: {ve}")
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {e}")
+
+
+@router.get("/score/{symbol}/stream")
+async def stock_score_stream(symbol: str, refresh: bool = False):
+    """
+    Streaming variant of /score/{symbol} as Server-Sent Events, in order:
+      progress  — one per input source as it arrives (then "scoring")
+      valuation — company + valuation block as soon as financials are in
+      token     — summary text deltas while the completion streams (plain text, no JSON)
+      result    — the final structured score (same shape as /score/{symbol})
+      error     — on failure; the stream then ends
+    """
+    symbol = symbol.upper()
+
+    async def events():
+        sources = score_input_sources(symbol)
+        yield sse("progress", {"stage": "gathering", "sources": list(sources)})
+
+        async def tagged(name, coro):
+            return name, await coro
+
+        inputs = {}
+        for next_done in asyncio.as_completed([tagged(n, c) for n, c in sources.items()]):
+            name, value = await next_done
+            inputs[name] = value
+            yield sse("progress", {"stage": "gathering", "source": name, "ok": bool(value)})
+            if name == "financials" and value and "error" not in value:
+                yield sse("valuation", {
+                    "symbol": symbol,
+                    "company": value.get("info", {}).get("shortName"),
+                    "valuation": build_valuation(value),
+                })
+
+        financial_data = inputs["financials"]
+        if not financial_data or "error" in financial_data:
+            detail = (financial_data or {}).get("error", "financial data unavailable")
+            yield sse("error", {"detail": f"Data error: {detail}"})
+            return
+
+        yield sse("progress", {"stage": "scoring"})
+        try:
+            async for kind, payload in stream_score(
+                financial_data, inputs["news"], inputs["macro"], use_cache=not refresh
+            ):
+                if kind == "token":
+                    yield sse("token", {"text": payload})
+                else:
+                    yield sse("result", build_score_response(symbol, payload, financial_data))
+        except Exception as e:
+            print(f"[ERROR] GPT streaming failed: {e}")
+            yield sse("error", {"detail": f"Analysis failed: {e}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/score/batch")
+async def submit_score_batch(request: ScoreBatchRequest):
+    """
+    Submit many symbols for scoring through the OpenAI Batch API.
+    Returns the job record at once (status "preparing"); inputs are gathered and
+    the batch is submitted in the background. Symbols whose inputs already have a
+    cached score are answered without OpenAI. Poll GET /score/batch/{job_id}.
+    """
+    return await submit_batch_scoring(request.symbols)
+
+
+@router.get("/score/batch/{job_id}")
+async def score_batch_status(job_id: str):
+    """Current status of a batch scoring job (refreshed from OpenAI)."""
+    job = await poll_batch_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch job {job_id}")
+    return job
+
+
+@router.get("/score/batch/{job_id}/results")
+async def score_batch_results(job_id: str):
+    """Scores collected so far for a batch scoring job, keyed by symbol."""
+    results = await get_batch_results(job_id)
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch job {job_id}")
+    return results
@@ -1,20 +1,29 @@
-import time
-from fastapi import APIRouter
-from app.integrations.economics import fetch_macro_indicators
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Query
+from app.integrations.economics import fetch_macro_view
 
 router = APIRouter()
 
 
 @router.get("/economics")
-def macro_indicators():
+async def macro_indicators(
+    indicators: str | None = Query(None, description="Comma-separated labels or FRED codes, e.g. DGS10,UNRATE (default: all)"),
+    start: date | None = Query(None, description="First date, YYYY-MM-DD (default: 20 years ago)"),
+    end: date | None = Query(None, description="Last date, YYYY-MM-DD (default: today)"),
+    freq: Literal["D", "W", "M", "Q"] = Query("M", description="Daily, weekly, monthly or quarterly buckets"),
+    agg: Literal["last", "mean"] = Query("last", description="Value per bucket: last observation or mean"),
+):
     """
-    Fetch macroeconomic indicators from FRED.
-    If resample_freq is provided (e.g. 'M' for monthly), each series
-    will be resampled (via .last()) to that freq and aligned.
+    Fetch macroeconomic indicators from FRED as columns:
+    {"dates": [...], "indicators": {label: [...]}}.
+    Example: /economics?indicators=DGS10&start=2023-01-01&freq=W&agg=mean
     """
-    start_time = time.time()
-    result = fetch_macro_indicators()
-    end_time = time.time()
-    elapsed_time = end_time - start_time
-    print(f"Elapsed time: {elapsed_time} seconds")
-    return result
+    names = [n for n in indicators.split(",") if n.strip()] if indicators else None
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    try:
+        return await fetch_macro_view(names, start, end, freq, agg)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,13 +1,30 @@
+import json
+
 from fastapi import APIRouter
-from app.integrations.financials import fetch_stock_financials
+from app.integrations.financials import fetch_stock_financials, fetch_stock_financials_batch
+from app.schemas.financials import FinancialsBatchRequest
 from app.utils.sanitizer_util import sanitize
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 router = APIRouter()
 
 
 @router.get("/financials/{symbol}")
-def get_financials(symbol: str, refresh: bool = False):
-    data = fetch_stock_financials(symbol, force_refresh=refresh)
+async def get_financials(symbol: str, refresh: bool = False):
+    data = await fetch_stock_financials(symbol, force_refresh=refresh)
     return data
 
+
+@router.post("/financials/batch")
+async def get_financials_batch(request: FinancialsBatchRequest):
+    """
+    Fetch financials for many symbols in one request.
+    Streams NDJSON, one line per symbol as soon as it is ready:
+    {"symbol": "AAPL", "cached": true, "data": {...}}
+    """
+
+    async def lines():
+        async for symbol, data, cached in fetch_stock_financials_batch(request.symbols, force_refresh=request.refresh):
+            yield json.dumps({"symbol": symbol, "cached": cached, "data": sanitize(data)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
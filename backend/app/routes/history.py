@@ -0,0 +1,37 @@
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Query
+from app.core.circuit import CircuitOpenError
+from app.integrations.history import get_history
+
+router = APIRouter()
+
+
+@router.get("/history/{symbol}")
+async def price_history(
+    symbol: str,
+    interval: Literal["1h", "1d", "1wk", "1mo"] = Query("1d", description="Bar size"),
+    start: date | None = Query(None, description="First date, YYYY-MM-DD (default: all stored history)"),
+    end: date | None = Query(None, description="Last date, YYYY-MM-DD (default: latest bar)"),
+    points: int = Query(500, ge=0, le=10000, description="Approximate number of bars returned (0 = no downsampling)"),
+    method: Literal["lttb", "ohlc"] = Query("lttb", description="lttb: keep shape-relevant bars; ohlc: merge bars into wider candles"),
+):
+    """
+    OHLCV bars served from the local history store, topped up from Yahoo when stale:
+    {"symbol", "interval", "points", "total_points", "dates", "open", "high", "low", "close", "volume"}.
+    Example: /history/AAPL?start=2015-01-01&points=300&method=ohlc
+    """
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if 0 < points < 3:
+        raise HTTPException(status_code=400, detail="points must be 0 or at least 3")
+    try:
+        history = await get_history(symbol, interval, start, end, points, method)
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=f"Price history unavailable: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Price history failed: {e}")
+    if history is None:
+        raise HTTPException(status_code=404, detail=f"No price history for {symbol.upper()}")
+    return history
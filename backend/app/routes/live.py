@@ -0,0 +1,54 @@
+import orjson
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.core.live import LIVE_MAX_SYMBOLS, connect, disconnect, send, subscribe, unsubscribe
+from app.integrations import live_feed  # noqa: F401  (registers the upstream feeds)
+from app.integrations.news import parse_symbols
+
+router = APIRouter(tags=["live"])
+
+
+@router.websocket("/ws/live")
+async def live_updates(websocket: WebSocket, symbols: str | None = None):
+    """
+    Push updates for watched symbols instead of polling /news and /financials.
+    Optional ?symbols=AAPL,MSFT subscribes on connect; afterwards send
+      {"action": "subscribe", "symbols": ["NVDA"]}
+      {"action": "unsubscribe", "symbols": ["AAPL"]}
+    Server messages: {"type": "quote" | "news", "symbol": ..., "data": ...},
+    plus {"type": "subscribed", "symbols": [...]} acknowledgements and {"type": "error", "detail": ...}.
+    The latest known quote/news is sent immediately on subscribe.
+    """
+    await websocket.accept()
+    connect(websocket)
+    try:
+        if symbols:
+            accepted = await subscribe(websocket, parse_symbols(symbols))
+            send(websocket, {"type": "subscribed", "symbols": accepted})
+
+        while True:
+            try:
+                message = orjson.loads(await websocket.receive_text())
+                action = message.get("action") if isinstance(message, dict) else None
+                requested = parse_symbols(message.get("symbols") or []) if action else []
+            except (orjson.JSONDecodeError, TypeError, AttributeError):
+                send(websocket, {"type": "error", "detail": 'Expected JSON like {"action": "subscribe", "symbols": ["AAPL"]}'})
+                continue
+
+            if action == "subscribe":
+                accepted = await subscribe(websocket, requested)
+                send(websocket, {"type": "subscribed", "symbols": accepted})
+                if len(accepted) < len(requested):
+                    send(websocket, {
+                        "type": "error",
+                        "detail": f"Not all symbols accepted: at most {LIVE_MAX_SYMBOLS} per connection, "
+                                  "already subscribed, or the live feed is at capacity",
+                    })
+            elif action == "unsubscribe":
+                unsubscribe(websocket, requested)
+                send(websocket, {"type": "unsubscribed", "symbols": requested})
+            else:
+                send(websocket, {"type": "error", "detail": "Expected action 'subscribe' or 'unsubscribe'"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnect(websocket)
@@ -0,0 +1,36 @@
+from fastapi import APIRouter
+from app.core.cache import CacheManager
+from app.core.circuit import breaker_states
+from app.core.ratelimit import quota_status
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/cache")
+async def cache_metrics():
+    """
+    Hit / miss / bypass counters of the cached expensive calls.
+    Example: {"gpt_score": {"hits": 40, "misses": 5, "hit_rate": 0.889}}
+    """
+    stats = await CacheManager.get_metrics("gpt_score")
+    lookups = stats.get("hits", 0) + stats.get("misses", 0)
+    stats["hit_rate"] = round(stats.get("hits", 0) / lookups, 3) if lookups else None
+    return {"gpt_score": stats}
+
+
+@router.get("/quota")
+async def quota_metrics():
+    """
+    Remaining rate-limit budget per upstream provider, shared across workers.
+    Example: {"fmp": {"tokens_remaining": 4.0, "daily_limit": 250, "used_today": 31, "429": 2, ...}}
+    """
+    return await quota_status()
+
+
+@router.get("/providers")
+async def provider_metrics():
+    """
+    Circuit breaker state per upstream provider in this worker.
+    Example: {"finnhub": {"state": "closed", "error_rate": 0.02, "latency_ms": 180, "slow": false, ...}}
+    """
+    return breaker_states()
@@ -1,39 +1,55 @@
-from fastapi import APIRouter, Query
-from app.integrations.news import get_news, get_news_grouped, get_news_mixed
+from fastapi import APIRouter, HTTPException, Query
+from app.integrations.news import get_news, get_news_grouped, get_news_mixed, get_news_mixed_page
 
 router = APIRouter(prefix="/news", tags=["news"])
 
 
 @router.get("/grouped")
-def grouped_news(
+async def grouped_news(
     symbols: str = Query(..., description="Comma-separated list of tickers"),
     days: int = Query(7, description="How many days back to fetch news"),
     max_items: int = Query(
         50, description="Max number of articles per company"),
 ):
     symbol_list = [s.strip() for s in symbols.split(",")]
-    grouped = get_news_grouped(symbol_list, max_items=max_items, days=days)
-
-    print(">>> Grouped returned:", grouped)
-    return grouped   # FastAPI will JSON-encode automatically
+    return await get_news_grouped(symbol_list, max_items=max_items, days=days)
 
 
 @router.get("/mixed")
-def mixed_news(
+async def mixed_news(
     symbols: str = Query(..., description="Comma-separated list of tickers"),
     days: int = Query(3, description="How many days back to fetch news"),
     max_items: int = Query(10, description="Max number of articles total"),
 ):
     """
-    Fetch combined news across all companies.
-    Example: /news/mixed?symbols=AAPL,NVDA
+    Fetch combined news across all companies, newest first and deduplicated, as a list.
+    Example: /news/mixed?symbols=AAPL,NVDA&max_items=20
+    """
+    symbol_list = [s.strip() for s in symbols.split(",")]
+    return await get_news_mixed(symbol_list, max_items=max_items, days=days)
+
+
+@router.get("/mixed/page")
+async def mixed_news_page(
+    symbols: str = Query(..., description="Comma-separated list of tickers"),
+    days: int = Query(3, description="How many days back to fetch news"),
+    max_items: int = Query(10, description="Max number of articles total (page size)"),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+):
+    """
+    Paginated variant of /news/mixed.
+    Returns {"articles": [...], "next_cursor": ...}; pass next_cursor back for the next page.
+    Example: /news/mixed/page?symbols=AAPL,NVDA&max_items=20
     """
     symbol_list = [s.strip() for s in symbols.split(",")]
-    return get_news_mixed(symbol_list, max_items=max_items, days=days)
+    try:
+        return await get_news_mixed_page(symbol_list, max_items=max_items, days=days, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/{symbol}")
-def company_news(
+async def company_news(
     symbol: str,
     days: int = Query(3, description="How many days back to fetch news"),
     max_items: int = Query(8, description="Max number of articles to return"),
@@ -42,4 +58,4 @@ def company_news(
     Fetch latest news for a single company.
     Example: /news/AAPL?days=5&max_items=12
     """
-    return get_news(symbol, days=days, max_items=max_items)
+    return await get_news(symbol, days=days, max_items=max_items)
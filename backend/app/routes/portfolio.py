@@ -1,10 +1,59 @@
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from app.core.circuit import CircuitOpenError
+from app.integrations.manual import compute_manual_portfolio, import_portfolio_csv
+from app.integrations.portfolio_analytics import fetch_portfolio_analytics
+from app.schemas.portfolio import (
+    ManualPortfolioRequest, PortfolioAnalyticsRequest, PortfolioAnalyticsResponse,
+    PortfolioImportResponse, PortfolioResponse,
+)
 
-router = APIRouter()
+router = APIRouter(tags=["portfolio"])
 
 
-@router.get("/portfolio/manual")
-def get_portfolio_manual(file):
-  pass
+@router.post("/portfolio/manual", response_model=PortfolioResponse)
+async def get_portfolio_manual(request: ManualPortfolioRequest):
+    """
+    Value a manually entered portfolio at current prices.
+    Example body: {"holdings": [{"symbol": "AAPL", "shares": 10}, {"symbol": "MSFT", "shares": 4}]}
+    """
+    try:
+        return await compute_manual_portfolio(request.holdings)
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=f"Pricing unavailable: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Pricing failed: {e}")
 
+
+@router.post("/portfolio/import", response_model=PortfolioImportResponse)
+async def import_portfolio(file: UploadFile = File(..., description="Broker CSV export")):
+    """
+    Import holdings from a CSV export and value them.
+    Needs a symbol column (symbol/ticker/instrument) and a shares column
+    (shares/quantity/no. of shares); an action column containing "sell" makes a row negative.
+    Lots of the same symbol are summed; fully sold positions are dropped.
+    """
+    try:
+        return await import_portfolio_csv(file.file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=f"Pricing unavailable: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Pricing failed: {e}")
+    finally:
+        await file.close()
+
+
+@router.post("/portfolio/analytics", response_model=PortfolioAnalyticsResponse)
+async def portfolio_analytics(request: PortfolioAnalyticsRequest):
+    """
+    Return series, volatility, beta vs the S&P 500, correlation matrix, max drawdown
+    and 1-day historical VaR for holding the given positions over `window`.
+    Example body: {"holdings": [{"symbol": "AAPL", "shares": 10}, {"symbol": "MSFT", "shares": 4}], "window": "3y"}
+    """
+    try:
+        return await fetch_portfolio_analytics(request.holdings, request.window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=f"Pricing unavailable: {e}")
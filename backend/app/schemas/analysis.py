@@ -0,0 +1,5 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+class ScoreBatchRequest(BaseModel):
+    symbols: List[str] = Field(..., min_length=1, max_length=5000)
@@ -0,0 +1,6 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+class FinancialsBatchRequest(BaseModel):
+    symbols: List[str] = Field(..., min_length=1, max_length=500)
+    refresh: bool = False
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Literal
 
 class StockInput(BaseModel):
@@ -10,8 +10,58 @@ class PortfolioItem(BaseModel):
     shares: float
     current_price: float
     value: float
+    weight: float = 0.0  # share of total_value (0..1)
     source: Literal["manual"] = "manual"
 
 class PortfolioResponse(BaseModel):
     total_value: float
     assets: List[PortfolioItem]
+    unpriced: List[str] = []  # symbols with no price available
+
+class ManualPortfolioRequest(BaseModel):
+    holdings: List[StockInput] = Field(..., min_length=1, max_length=10000)
+
+class PortfolioImportResponse(PortfolioResponse):
+    rows: int                # data rows read from the CSV
+    invalid_rows: int        # rows skipped by validation
+    errors: List[str] = []   # first few row errors, "line N: ..."
+
+AnalyticsWindow = Literal["3mo", "6mo", "1y", "3y", "5y"]
+
+class PortfolioAnalyticsRequest(BaseModel):
+    holdings: List[StockInput] = Field(..., min_length=1, max_length=1000)
+    window: AnalyticsWindow = "1y"
+
+class AssetRisk(BaseModel):
+    symbol: str
+    weight: float                  # signed share of gross exposure (negative = short)
+    total_return: float            # of the instrument over the window
+    volatility: float              # annualized std of daily returns
+    beta: Optional[float] = None   # vs S&P 500; None when the benchmark is unavailable
+    max_drawdown: float            # worst peak-to-trough loss (negative)
+
+class ReturnSeries(BaseModel):
+    dates: List[str]
+    cumulative_return: List[float]  # portfolio growth per unit of gross exposure since the window start
+
+class CorrelationMatrix(BaseModel):
+    symbols: List[str]
+    matrix: List[List[float]]  # daily return correlations, rows/columns in `symbols` order
+
+class PortfolioAnalyticsResponse(BaseModel):
+    window: AnalyticsWindow
+    start: str
+    end: str
+    observations: int               # daily returns used
+    total_return: float
+    volatility: float
+    beta: Optional[float] = None
+    max_drawdown: float
+    var_95: float                   # 1-day historical VaR, fraction of value
+    var_99: float
+    var_95_value: float             # var_95 applied to the current gross exposure
+    returns: ReturnSeries
+    correlation: CorrelationMatrix
+    assets: List[AssetRisk]
+    missing: List[str] = []         # symbols left out: flat positions or not enough price history
+    split_adjusted: List[str] = []  # symbols whose unadjusted split jumps were rescaled
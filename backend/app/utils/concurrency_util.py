@@ -0,0 +1,64 @@
+import asyncio
+
+# Strong refs to fire-and-forget tasks so they are not garbage-collected mid-flight
+_background: set[asyncio.Task] = set()
+
+
+async def fan_out(tasks: dict, deadline: float) -> dict:
+    """
+    Run every awaitable concurrently and wait at most `deadline` seconds overall.
+    `tasks` maps a name to a coroutine.
+    Returns {name: result}; tasks that fail or miss the deadline map to None.
+    """
+    futures = {name: asyncio.ensure_future(coro) for name, coro in tasks.items()}
+    if not futures:
+        return {}
+    _, not_done = await asyncio.wait(futures.values(), timeout=deadline)
+
+    results = {}
+    for name, future in futures.items():
+        if future in not_done:
+            future.cancel()
+            print(f"⏱️  {name} missed the {deadline}s deadline")
+            results[name] = None
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            print(f"⚠️  {name} failed: {e}")
+            results[name] = None
+    return results
+
+
+def spawn(coro) -> asyncio.Task:
+    """Schedule `coro` in the background; failures are logged, never raised."""
+    task = asyncio.create_task(coro)
+    _background.add(task)
+
+    def done(t: asyncio.Task):
+        _background.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            print(f"⚠️  Background task failed: {t.exception()}")
+
+    task.add_done_callback(done)
+    return task
+
+
+async def with_deadline(coro, deadline: float, default=None, name: str = ""):
+    """
+    Await `coro` for at most `deadline` seconds; on timeout or error return `default`.
+    Work shared through CacheManager.get_or_compute keeps running past the deadline
+    and still caches its result. A CancelledError raised by the awaited work (rather
+    than by cancelling this caller) also degrades to `default`.
+    """
+    try:
+        return await asyncio.wait_for(coro, timeout=deadline)
+    except asyncio.TimeoutError:
+        print(f"⏱️  {name or 'task'} missed the {deadline}s deadline")
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            raise  # we ourselves are being cancelled
+        print(f"⚠️  {name or 'task'} was cancelled")
+    except Exception as e:
+        print(f"⚠️  {name or 'task'} failed: {e}")
+    return default
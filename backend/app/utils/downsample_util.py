@@ -0,0 +1,56 @@
+import numpy as np
+
+
+def bucket_starts(n: int, buckets: int) -> np.ndarray:
+    """Start index of each of `buckets` near-equal, contiguous slices of n rows."""
+    return np.unique(np.arange(buckets) * n // buckets)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the
+    visual shape of (x, y). First and last points are always kept.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # interior buckets over points 1 .. n-2
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(int) + 1
+    edges[-1] = n - 1
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # average of the next bucket (or the last point for the final bucket)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def ohlc_buckets(open_, high, low, close, volume, buckets: int) -> tuple[np.ndarray, ...]:
+    """
+    Aggregates bars into `buckets` contiguous groups: first open, max high, min low,
+    last close, summed volume. Returns (start indices, open, high, low, close, volume).
+    """
+    n = len(close)
+    if buckets >= n:
+        return np.arange(n), open_, high, low, close, volume
+    starts = bucket_starts(n, buckets)
+    ends = np.append(starts[1:], n) - 1
+    return (
+        starts,
+        open_[starts],
+        np.maximum.reduceat(high, starts),
+        np.minimum.reduceat(low, starts),
+        close[ends],
+        np.add.reduceat(volume, starts),
+    )
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import re
+import datetime
+
+import pandas as pd
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken is optional; fall back to a ~4 chars/token estimate
+    _encoding = None
+
+# Provider fields that cost tokens but carry no signal for scoring
+NOISE_KEYS = {
+    "link", "finalLink", "cik", "fillingDate", "acceptedDate", "image", "url",
+    "id", "calendarYear", "reportedCurrency",
+}
+
+NEWS_SUMMARY_CHARS = 280
+ANALYST_PERIODS = 3
+CHANGE_TOLERANCE_DAYS = 46  # half a quarter: quarterly series still find their year-ago value
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def to_json(obj) -> str:
+    """Compact JSON (no whitespace) as sent to the model."""
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def drop_empty(obj):
+    """Recursively drop None / NaN values, noise keys and empty containers."""
+    if isinstance(obj, dict):
+        clean = {}
+        for k, v in obj.items():
+            if k in NOISE_KEYS:
+                continue
+            v = drop_empty(v)
+            if v is not None and v != {} and v != []:
+                clean[k] = v
+        return clean
+    if isinstance(obj, list):
+        return [v for v in (drop_empty(v) for v in obj) if v is not None and v != {} and v != []]
+    if isinstance(obj, float) and obj != obj:
+        return None
+    return obj
+
+
+def summarize_series(dates: list[str], values: list) -> dict | None:
+    """
+    Dated values (oldest first, any frequency) -> latest level, 1y / 5y changes and
+    6-month trend. Changes compare against the observation nearest to the same
+    date 1 / 5 years earlier (None when there is none within CHANGE_TOLERANCE_DAYS).
+    """
+    series = pd.Series(values, index=pd.to_datetime(dates), dtype="float64").dropna()
+    if series.empty:
+        return None
+
+    date, latest = series.index[-1], float(series.iloc[-1])
+
+    def change(months: int):
+        target = date - pd.DateOffset(months=months)
+        i = series.index.get_indexer([target], method="nearest")[0]
+        if abs(series.index[i] - target) > pd.Timedelta(days=CHANGE_TOLERANCE_DAYS):
+            return None
+        past = float(series.iloc[i])
+        return round((latest - past) / abs(past) * 100, 2) if past else None
+
+    recent = series[series.index >= date - pd.DateOffset(months=6)]
+    first = float(recent.iloc[0])
+    slope = (latest - first) / abs(first) if len(recent) > 1 and first else 0
+    trend = "rising" if slope > 0.01 else "falling" if slope < -0.01 else "flat"
+
+    return {
+        "as_of": date.strftime("%Y-%m-%d"),
+        "latest": round(latest, 4),
+        "chg_1y_pct": change(12),
+        "chg_5y_pct": change(60),
+        "trend_6m": trend,
+    }
+
+
+def summarize_macro(economical_data: dict) -> dict:
+    """Replaces the columnar macro histories ({"dates", "indicators"}) with recent levels and trends."""
+    if not isinstance(economical_data, dict):
+        return {}
+    dates = economical_data.get("dates") or []
+    return {
+        label: summarize_series(dates, values)
+        for label, values in (economical_data.get("indicators") or {}).items()
+    }
+
+
+def headline_hash(headline: str) -> str:
+    """Hash of a headline with case, punctuation and spacing normalized (for dedup)."""
+    normalized = re.sub(r"[^a-z0-9 ]", "", (headline or "").lower())
+    return hashlib.md5(" ".join(normalized.split()).encode()).hexdigest()
+
+
+def rank_news(news_data, keywords: list[str], limit: int) -> list[dict]:
+    """
+    Dedups articles by URL and headline, ranks them by recency with a boost for
+    headlines that mention the company, and keeps only the fields the model needs.
+    """
+    if not isinstance(news_data, list):
+        return []
+
+    seen, unique = set(), []
+    for article in news_data:
+        if not isinstance(article, dict):
+            continue
+        keys = {article.get("url"), headline_hash(article.get("headline"))} - {None}
+        if keys & seen:
+            continue
+        seen |= keys
+        unique.append(article)
+
+    words = [k.lower() for k in keywords if k]
+
+    def relevance(article: dict) -> float:
+        mentions = any(w in (article.get("headline") or "").lower() for w in words)
+        return (article.get("datetime") or 0) + (86400 if mentions else 0)
+
+    ranked = sorted(unique, key=relevance, reverse=True)[:limit]
+    return [
+        {
+            "date": datetime.datetime.fromtimestamp(a["datetime"], datetime.UTC).strftime("%Y-%m-%d")
+            if a.get("datetime") else None,
+            "source": a.get("source"),
+            "headline": a.get("headline"),
+            "summary": (a.get("summary") or "")[:NEWS_SUMMARY_CHARS],
+        }
+        for a in ranked
+    ]
+
+
+def compact_payload(safe_payload: dict, budget: int, keywords: list[str] | None = None) -> dict:
+    """
+    Shrinks the scoring payload until its JSON fits `budget` tokens.
+    Always returns a complete, valid JSON-serializable dict; stages are applied in
+    order of least information lost: summarize macro, rank news, drop empties,
+    then progressively fewer news items, shorter summaries, fewer analyst periods,
+    and finally whole low-priority sections.
+    """
+    payload = dict(safe_payload)
+    payload["economical_data"] = summarize_macro(payload.get("economical_data"))
+
+    news = rank_news(payload.get("news_data"), keywords or [], limit=20)
+    analyst = payload.get("analyst_data")
+    if isinstance(analyst, list):
+        analyst = analyst[:ANALYST_PERIODS]
+
+    def build(news_items, summary_chars, analyst_data):
+        candidate = dict(payload)
+        candidate["news_data"] = [
+            {**a, "summary": a["summary"][:summary_chars]} if summary_chars else {k: v for k, v in a.items() if k != "summary"}
+            for a in news_items
+        ]
+        candidate["analyst_data"] = analyst_data
+        return drop_empty(candidate)
+
+    attempts = [
+        (news, NEWS_SUMMARY_CHARS, analyst),
+        (news[:10], NEWS_SUMMARY_CHARS, analyst),
+        (news[:10], 120, analyst),
+        (news[:5], 0, analyst[:1] if isinstance(analyst, list) else analyst),
+        (news[:3], 0, None),
+    ]
+    for news_items, summary_chars, analyst_data in attempts:
+        candidate = build(news_items, summary_chars, analyst_data)
+        if count_tokens(to_json(candidate)) <= budget:
+            return candidate
+
+    # Last resort: drop whole sections, least important first
+    for section in ("news_data", "economical_data", "financials", "analyst_data"):
+        candidate.pop(section, None)
+        if count_tokens(to_json(candidate)) <= budget:
+            break
+    return candidate
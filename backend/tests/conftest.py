@@ -0,0 +1,5 @@
+import os
+
+# API clients are built at import time; unit tests never reach the network.
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("FRED_API_KEY", "test")
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from app.core import cache
+from app.core.cache import CacheManager
+from app.core.lru import LRUCache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+KEY = CacheManager.make_key("financials", "AAPL")
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(cache, "r", client)
+    monkeypatch.setattr(cache, "_release_lock", client.register_script(cache._release_lock.script))
+    monkeypatch.setattr(cache, "_l1", LRUCache(max_items=cache.L1_MAX_ITEMS, ttl=cache.L1_TTL))
+    monkeypatch.setattr(cache, "_flights", {})
+    return client
+
+
+def counting(value, delay: float = 0.05):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+
+    return compute, calls
+
+
+def test_concurrent_misses_share_one_compute():
+    compute, calls = counting({"price": 1})
+
+    async def run():
+        return await asyncio.gather(*(CacheManager.get_or_compute(KEY, compute) for _ in range(5)))
+
+    assert asyncio.run(run()) == [{"price": 1}] * 5
+    assert len(calls) == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_flight():
+    compute, calls = counting({"price": 2})
+
+    async def run():
+        first = asyncio.create_task(CacheManager.get_or_compute(KEY, compute))
+        second = asyncio.create_task(CacheManager.get_or_compute(KEY, compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, await CacheManager.get(KEY)
+
+    assert asyncio.run(run()) == ({"price": 2}, {"price": 2})
+    assert len(calls) == 1
+
+
+def test_l1_hits_are_private_copies():
+    async def run():
+        await CacheManager.set(KEY, {"tags": ["a"]})
+        first = await CacheManager.get(KEY)
+        first["tags"].append("mutated")
+        return await CacheManager.get(KEY)
+
+    assert asyncio.run(run()) == {"tags": ["a"]}
+
+
+def test_stale_entry_is_served_and_refreshed(fake_redis):
+    compute, calls = counting({"price": 4}, delay=0)
+
+    async def run():
+        await CacheManager.set(KEY, {"price": 3})
+        await fake_redis.delete(f"{KEY}:fresh")
+        cache._l1.clear()
+        stale = await CacheManager.get_or_compute(KEY, compute)
+        await asyncio.sleep(0.05)
+        return stale, await CacheManager.get(KEY)
+
+    assert asyncio.run(run()) == ({"price": 3}, {"price": 4})
+    assert len(calls) == 1
+
+
+def test_get_many_refreshes_stale_keys(fake_redis):
+    keys = [CacheManager.make_key("financials", s) for s in ("A", "B", "C")]
+    refreshed = []
+
+    async def refresh(stale: list[str]):
+        refreshed.extend(stale)
+
+    async def run():
+        await CacheManager.set_many({keys[0]: 1, keys[1]: 2})
+        await fake_redis.delete(f"{keys[1]}:fresh")
+        cache._l1.clear()
+        values = await CacheManager.get_many(keys, refresh=refresh)
+        await asyncio.sleep(0.05)
+        return values
+
+    assert asyncio.run(run()) == [1, 2, None]
+    assert refreshed == [keys[1]]
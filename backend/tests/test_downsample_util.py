@@ -0,0 +1,54 @@
+import numpy as np
+
+from app.utils.downsample_util import bucket_starts, lttb, ohlc_buckets
+
+
+def test_bucket_starts_cover_all_rows():
+    starts = bucket_starts(10, 3)
+    assert starts.tolist() == [0, 3, 6]
+    assert bucket_starts(2, 5).tolist() == [0, 1]
+
+
+def test_lttb_keeps_endpoints_and_count():
+    x = np.arange(1000, dtype="float64")
+    y = np.sin(x / 50)
+    keep = lttb(x, y, 100)
+    assert len(keep) == 100
+    assert keep[0] == 0 and keep[-1] == 999
+    assert (np.diff(keep) > 0).all()
+
+
+def test_lttb_keeps_spike():
+    x = np.arange(500, dtype="float64")
+    y = np.zeros(500)
+    y[321] = 10.0
+    assert 321 in lttb(x, y, 20)
+
+
+def test_lttb_returns_all_when_below_threshold():
+    x = np.arange(5, dtype="float64")
+    assert lttb(x, x, 10).tolist() == [0, 1, 2, 3, 4]
+    assert lttb(x, x, 2).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_ohlc_buckets_aggregate_bars():
+    open_ = np.array([1.0, 2, 3, 4, 5, 6])
+    high = np.array([2.0, 9, 4, 5, 6, 7])
+    low = np.array([0.5, 1, 2, 3, 0.1, 5])
+    close = np.array([1.5, 2.5, 3.5, 4.5, 5.5, 6.5])
+    volume = np.array([10.0, 20, 30, 40, 50, 60])
+
+    starts, o, h, lo, c, v = ohlc_buckets(open_, high, low, close, volume, buckets=2)
+    assert starts.tolist() == [0, 3]
+    assert o.tolist() == [1.0, 4.0]
+    assert h.tolist() == [9.0, 7.0]
+    assert lo.tolist() == [0.5, 0.1]
+    assert c.tolist() == [3.5, 6.5]
+    assert v.tolist() == [60.0, 150.0]
+
+
+def test_ohlc_buckets_passthrough_when_few_bars():
+    bars = [np.arange(3, dtype="float64")] * 5
+    starts, *aggregated = ohlc_buckets(*bars, buckets=10)
+    assert starts.tolist() == [0, 1, 2]
+    assert all(a is b for a, b in zip(aggregated, bars))
@@ -0,0 +1,54 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from app.core import frame_store
+from app.core.lru import LRUCache
+from app.integrations import economics
+
+
+@pytest.fixture
+def stale_store(monkeypatch):
+    """A FRED store whose series are all past FRED_SYNC_INTERVAL, with a failing upstream."""
+    stored = {"fred/CPIAUCSL": pd.DataFrame({"value": [300.0, 301.0]}, index=pd.to_datetime(["2024-01-01", "2024-02-01"]))}
+
+    async def acquire(provider, cost=1, deadline=None):
+        pass
+
+    def sync(fred, code):
+        raise ConnectionError("FRED is down")
+
+    monkeypatch.setattr(economics, "acquire", acquire)
+    monkeypatch.setattr(economics, "sync_fred_series", sync)
+    monkeypatch.setattr(frame_store, "frame_age", lambda name: economics.FRED_SYNC_INTERVAL * 2 if name in stored else None)
+    monkeypatch.setattr(frame_store, "read_frame", lambda name: stored.get(name))
+
+
+def test_failed_sync_serves_stored_series(stale_store):
+    series = asyncio.run(economics.load_fred_series(None, "CPIAUCSL"))
+    assert series.tolist() == [300.0, 301.0]
+
+
+def test_failed_sync_without_stored_copy_raises(stale_store):
+    with pytest.raises(ConnectionError):
+        asyncio.run(economics.load_fred_series(None, "UNRATE"))
+
+
+def test_concurrent_requests_share_one_frame_rebuild(monkeypatch):
+    builds = []
+
+    async def load():
+        builds.append(1)
+        await asyncio.sleep(0.05)
+        return pd.DataFrame({"CPI (All Items)": [1.0]}, index=pd.to_datetime(["2024-01-01"]))
+
+    monkeypatch.setattr(economics, "_base_frames", LRUCache(max_items=1, ttl=economics.BASE_FRAME_TTL))
+    monkeypatch.setattr(economics, "load_indicator_frame", load)
+
+    async def run():
+        return await asyncio.gather(*(economics.get_indicator_frame() for _ in range(10)))
+
+    frames = asyncio.run(run())
+    assert len(builds) == 1
+    assert all(frame is frames[0] for frame in frames)
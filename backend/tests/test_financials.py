@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from app.core import circuit
+from app.integrations import financials
+from app.integrations.financials import first_answer, flatten_results, route_provider_calls
+
+# Every call build_provider_tasks makes when all keys are configured
+CALLS = {
+    "finnhub_profile": ("finnhub", None),
+    "finnhub_quote": ("finnhub", None),
+    "finnhub_metrics": ("finnhub", None),
+    "finnhub_recs": ("finnhub", None),
+    "twelve_quote": ("twelvedata", None),
+    "fmp_ratios": ("fmp", None),
+    "fmp_income": ("fmp", None),
+    "yf_dividends": ("yfinance", None),
+    "yahoo_profile": ("rapidapi", None),
+    "yahoo_financial": ("rapidapi", None),
+    "yahoo_statistics": ("rapidapi", None),
+}
+UNGROUPED = set(CALLS) - {"finnhub_quote", "twelve_quote"}
+
+
+@pytest.fixture(autouse=True)
+def breakers(monkeypatch):
+    monkeypatch.setattr(circuit, "_breakers", {})
+
+
+def test_healthy_providers_try_finnhub_quote_first():
+    routes = route_provider_calls(CALLS)
+    assert routes.pop("quote") == ["finnhub_quote", "twelve_quote"]
+    assert routes == {name: [name] for name in UNGROUPED}
+
+
+def test_open_circuit_drops_provider_calls():
+    circuit.get_breaker("finnhub")._open()
+    routes = route_provider_calls(CALLS)
+    assert routes["quote"] == ["twelve_quote"]
+    assert not {"finnhub_profile", "finnhub_metrics", "finnhub_recs"} & set(routes)
+
+
+def test_slow_provider_moves_quote_last_but_keeps_unique_fields():
+    circuit.get_breaker("finnhub").record(True, circuit.SLOW_CALL_SECONDS * 2)
+    routes = route_provider_calls(CALLS)
+    assert routes["quote"] == ["twelve_quote", "finnhub_quote"]
+    assert "finnhub_profile" in routes
+
+
+def test_yahoo_calls_are_always_made_when_available():
+    yahoo = {"yf_dividends", "yahoo_profile", "yahoo_financial", "yahoo_statistics"}
+    circuit.get_breaker("rapidapi").record(True, circuit.SLOW_CALL_SECONDS * 2)
+    assert yahoo <= set(route_provider_calls(CALLS))
+    circuit.get_breaker("rapidapi")._open()
+    assert not {"yahoo_profile", "yahoo_financial", "yahoo_statistics"} & set(route_provider_calls(CALLS))
+
+
+def test_only_configured_quote_provider_is_used():
+    calls = {name: call for name, call in CALLS.items() if name != "finnhub_quote"}
+    assert route_provider_calls(calls)["quote"] == ["twelve_quote"]
+
+
+def test_first_answer_falls_back_on_empty_result():
+    tried = []
+
+    def call(name, result):
+        async def fetch():
+            tried.append(name)
+            return result
+        return name, ("provider", fetch)
+
+    calls = dict([call("finnhub_quote", None), call("twelve_quote", {"close": "1.0"})])
+    assert asyncio.run(first_answer(calls, ["finnhub_quote", "twelve_quote"])) == {"twelve_quote": {"close": "1.0"}}
+    assert tried == ["finnhub_quote", "twelve_quote"]
+
+    tried.clear()
+    calls = dict([call("finnhub_quote", {"c": 1.0}), call("twelve_quote", {"close": "1.0"})])
+    assert asyncio.run(first_answer(calls, ["finnhub_quote", "twelve_quote"])) == {"finnhub_quote": {"c": 1.0}}
+    assert tried == ["finnhub_quote"]
+
+
+def test_flatten_results_unpacks_groups():
+    results = {"finnhub_profile": {"name": "Apple"}, "quote": {"twelve_quote": {"close": "1.0"}}}
+    assert flatten_results(results) == {"finnhub_profile": {"name": "Apple"}, "twelve_quote": {"close": "1.0"}}
+    assert flatten_results({"quote": None}) == {}
+
+
+def test_quote_falls_back_end_to_end(monkeypatch):
+    monkeypatch.setattr(financials, "FINNHUB_KEY", "k")
+    monkeypatch.setattr(financials, "TWELVE_KEY", "k")
+    monkeypatch.setattr(financials, "FMP_KEY", None)
+    monkeypatch.setattr(financials, "RAPIDAPI_KEY", None)
+
+    async def safe_get(url, params=None, source_name=""):
+        return None if "finnhub" in url else {"close": "1.0"}
+
+    monkeypatch.setattr(financials, "safe_get", safe_get)
+    monkeypatch.setattr(financials, "fetch_yf_dividends", lambda symbol: {})
+    merged = asyncio.run(financials.fetch_fresh_financials("AAPL"))
+    assert merged["quote"] == {"close": "1.0"}
+    assert merged["sources"]["quote"] == "twelvedata"
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from app.integrations.gpt import SummaryExtractor
+
+ANSWER = json.dumps({
+    "score": 7,
+    "summary": 'Solid "moat",\nback\\slash, café — steady.',
+    "positives": ["summary-like text: \"x\""],
+}, ensure_ascii=True)
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 7, len(ANSWER)])
+def test_summary_extractor_decodes_across_deltas(chunk):
+    extractor = SummaryExtractor()
+    text = "".join(extractor.feed(ANSWER[i:i + chunk]) for i in range(0, len(ANSWER), chunk))
+    assert text == json.loads(ANSWER)["summary"]
+    assert extractor.done
+
+
+def test_summary_extractor_ignores_text_before_the_key():
+    extractor = SummaryExtractor()
+    assert extractor.feed('{"score": 4, "summ') == ""
+    assert extractor.feed('ary": "Up') == "Up"
+    assert extractor.feed('\\') == ""
+    assert extractor.feed('u0021"}') == "!"
+    assert extractor.feed(' "summary": "again"') == ""
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 5, 6, 7, 11])
+def test_summary_extractor_joins_surrogate_pairs(chunk):
+    answer = json.dumps({"summary": "Up 😀 today \U0001F4C8"}, ensure_ascii=True)
+    assert "\\ud83d\\ude00" in answer
+    extractor = SummaryExtractor()
+    text = "".join(extractor.feed(answer[i:i + chunk]) for i in range(0, len(answer), chunk))
+    assert text == "Up 😀 today \U0001F4C8"
+    text.encode("utf-8")
+
+
+def test_summary_extractor_replaces_unpaired_surrogates():
+    extractor = SummaryExtractor()
+    assert extractor.feed('{"summary": "a\\ud83d\\nb\\ude00"}') == "a\ufffd\nb\ufffd"
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from app.integrations.history import STORED_COLUMNS, _clean_bars, _needs_rebase
+
+
+def yahoo_bars(closes: list[float], splits: list[float] | None = None, start: str = "2024-01-01") -> pd.DataFrame:
+    index = pd.date_range(start, periods=len(closes), tz="America/New_York")
+    bars = pd.DataFrame({c: closes for c in ("Open", "High", "Low", "Close", "Adj Close")}, index=index)
+    bars["Volume"] = 100.0
+    bars["Dividends"] = 0.0
+    bars["Stock Splits"] = splits or [0.0] * len(closes)
+    return bars
+
+
+def test_clean_bars_keeps_store_columns():
+    bars = _clean_bars(yahoo_bars([1.0, 2.0, 3.0], splits=[0.0, 2.0, 0.0]))
+    assert bars.columns.tolist() == STORED_COLUMNS
+    assert bars["splits"].tolist() == [0.0, 2.0, 0.0]
+    assert bars.index.tz is None
+
+
+def test_clean_bars_without_split_column():
+    bars = _clean_bars(yahoo_bars([1.0, 2.0]).drop(columns=["Stock Splits"]))
+    assert bars["splits"].tolist() == [0.0, 0.0]
+
+
+def test_needs_rebase_on_split_after_overlap():
+    stored = _clean_bars(yahoo_bars([100.0, 101.0, 102.0]))
+    fresh = yahoo_bars([101.0, 51.0, 52.0], splits=[0.0, 2.0, 0.0], start="2024-01-02")
+    assert _needs_rebase(stored, fresh)
+
+
+def test_needs_rebase_on_rescaled_overlap_close():
+    stored = _clean_bars(yahoo_bars([100.0, 101.0, 102.0]))
+    assert _needs_rebase(stored, yahoo_bars([50.5, 51.0], start="2024-01-02"))
+    assert not _needs_rebase(stored, yahoo_bars([101.0, 103.0], start="2024-01-02"))
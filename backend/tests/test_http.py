@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from app.core import circuit, http
+from app.core.circuit import CircuitOpenError
+from app.core.ratelimit import RateLimitExceeded
+
+URL = "https://financialmodelingprep.com/api/v3/ratios/AAPL"
+
+
+@pytest.fixture(autouse=True)
+def breakers(monkeypatch):
+    monkeypatch.setattr(circuit, "_breakers", {})
+
+
+@pytest.fixture
+def tokens(monkeypatch):
+    taken = []
+
+    async def acquire(provider, cost=1, deadline=None):
+        taken.append(provider)
+
+    monkeypatch.setattr(http, "acquire", acquire)
+    return taken
+
+
+def test_open_circuit_spends_no_token(tokens):
+    circuit.get_breaker("fmp")._open()
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(http.http_get(URL))
+    assert tokens == []
+
+
+def test_refused_token_hands_back_the_probe(monkeypatch):
+    async def acquire(provider, cost=1, deadline=None):
+        raise RateLimitExceeded("fmp daily quota of 250 calls is used up")
+
+    monkeypatch.setattr(http, "acquire", acquire)
+    breaker = circuit.get_breaker("fmp")
+    breaker._open()
+    breaker.opened_at -= circuit.OPEN_SECONDS  # cooled down: the next call is the probe
+
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(http.http_get(URL))
+    assert breaker.allow()  # the probe is still available
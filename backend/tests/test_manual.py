@@ -0,0 +1,63 @@
+import io
+
+import pytest
+
+from app.integrations import manual
+from app.integrations.manual import aggregate_shares, parse_holdings_csv
+from app.schemas.portfolio import StockInput
+
+
+def parse(text: str):
+    return parse_holdings_csv(io.BytesIO(text.encode("utf-8")))
+
+
+def test_parse_holdings_csv_nets_buys_and_sells():
+    shares, stats = parse(
+        "Date,Action,Ticker,Quantity\n"
+        "2024-01-02,Buy,aapl,10\n"
+        "2024-01-03,BUY,NVDA,\"1,000\"\n"
+        "2024-02-01,Sell,AAPL,4\n"
+        "2024-02-02,Sell,MSFT,5\n"
+        "\n"
+    )
+    assert shares.to_dict() == {"AAPL": 6.0, "NVDA": 1000.0}  # MSFT nets negative and is left out
+    assert stats == {"rows": 4, "invalid_rows": 0, "errors": []}
+
+
+def test_parse_holdings_csv_signed_sells_stay_negative():
+    shares, _ = parse("Action,Symbol,Quantity\nBuy,AAPL,10\nSell,AAPL,-4\nSell,AAPL,+1\n")
+    assert shares.to_dict() == {"AAPL": 5.0}
+
+
+def test_parse_holdings_csv_reports_bad_rows():
+    shares, stats = parse(
+        "\ufeffSymbol,Shares\n"
+        "AAPL,3\n"
+        "MSFT,lots\n"
+        "NVDA\n"
+        "AAPL,2\n"
+    )
+    assert shares.to_dict() == {"AAPL": 5.0}
+    assert stats["rows"] == 4
+    assert stats["invalid_rows"] == 2
+    assert [e.split(":")[0] for e in stats["errors"]] == ["line 4", "line 3"]
+
+
+def test_parse_holdings_csv_validates_across_batches(monkeypatch):
+    monkeypatch.setattr(manual, "IMPORT_BATCH_ROWS", 2)
+    shares, stats = parse("symbol,qty\n" + "A,1\n" * 5 + "B,x\n")
+    assert shares.to_dict() == {"A": 5.0}
+    assert stats["invalid_rows"] == 1
+
+
+def test_parse_holdings_csv_needs_symbol_and_shares():
+    with pytest.raises(ValueError):
+        parse("name,price\nApple,100\n")
+
+
+def test_aggregate_shares_merges_symbols():
+    shares = aggregate_shares([
+        StockInput(symbol=" aapl", shares=2), StockInput(symbol="AAPL", shares=3),
+        StockInput(symbol="", shares=9), StockInput(symbol="tsla", shares=-1),
+    ])
+    assert shares.to_dict() == {"AAPL": 5.0, "TSLA": -1.0}
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from app.core import article_store
+from app.integrations.news import decode_cursor, encode_cursor, merge_feeds
+
+
+def article(doc_id: str, t: float, headline: str | None = None, url: str | None = None) -> dict:
+    return {"id": doc_id, "datetime": t, "headline": headline or f"headline {doc_id}", "url": url or f"https://x/{doc_id}"}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """In-memory article store: symbol -> {article id: (datetime, article)}, read like ZREVRANGEBYSCORE."""
+    streams: dict[str, dict[str, tuple[float, dict]]] = {}
+
+    async def read_pages(pages):
+        result = []
+        for symbol, until, since, offset, num in pages:
+            upper = float(until)
+            entries = sorted(
+                ((doc_id, t, a) for doc_id, (t, a) in streams.get(symbol, {}).items() if since <= t <= upper),
+                key=lambda e: (e[1], e[0]), reverse=True,
+            )
+            result.append(entries[offset:offset + num])
+        return result
+
+    monkeypatch.setattr(article_store, "read_pages", read_pages)
+    return streams
+
+
+def add(streams: dict, symbol: str, *articles: dict):
+    for a in articles:
+        streams.setdefault(symbol, {})[a["id"]] = (a["datetime"], a)
+
+
+def read_all(symbols: list[str], limit: int) -> list[list[str]]:
+    """Follows next_cursor through the feed, like a client would (encoded cursor in between)."""
+    pages, cursor = [], None
+    while True:
+        articles, cursor = asyncio.run(merge_feeds(symbols, 0.0, limit, decode_cursor(cursor) if cursor else None))
+        pages.append([a["id"] for a in articles])
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(1700000000.0, "abc", {"https://x/1", "h1"})
+    assert decode_cursor(cursor) == {"t": 1700000000.0, "id": "abc", "seen": {"https://x/1", "h1"}}
+
+
+@pytest.mark.parametrize("bad", ["not-base64!", "e30=", encode_cursor(1.0, "a", set())[:-4]])
+def test_decode_cursor_rejects_garbage(bad):
+    with pytest.raises(ValueError):
+        decode_cursor(bad)
+
+
+def test_merge_is_newest_first_and_deduplicated(store):
+    add(store, "AAPL", article("a1", 10), article("a2", 30), article("shared-a", 20, headline="Both"))
+    add(store, "NVDA", article("n1", 25), article("shared-n", 20, headline="Both"))
+
+    articles, next_cursor = asyncio.run(merge_feeds(["AAPL", "NVDA"], 0.0, 10))
+    assert [a["id"] for a in articles] == ["a2", "n1", "shared-n", "a1"]
+    assert next_cursor is None
+
+
+def test_pages_cover_feed_once(store):
+    add(store, "AAPL", *(article(f"a{i}", 100 - i) for i in range(12)))
+    add(store, "NVDA", *(article(f"n{i}", 100 - i) for i in range(12)))  # same timestamps as AAPL
+
+    pages = read_all(["AAPL", "NVDA"], limit=5)
+    ids = [doc_id for page in pages for doc_id in page]
+    assert len(ids) == len(set(ids)) == 24
+    assert all(len(page) == 5 for page in pages[:-1])
+    times = [100 - int(doc_id[1:]) for doc_id in ids]
+    assert times == sorted(times, reverse=True)
+
+
+def test_pages_keep_dedup_across_same_second_boundary(store):
+    add(store, "AAPL", article("a1", 50, headline="Same story"), article("a0", 60))
+    add(store, "NVDA", article("n1", 50, headline="Same story"), article("n0", 40))
+
+    pages = read_all(["AAPL", "NVDA"], limit=2)
+    ids = [doc_id for page in pages for doc_id in page]
+    assert ids == ["a0", "n1", "n0"]  # a1 repeats n1's headline on the next page
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from app.utils.payload_util import summarize_series
+
+
+def monthly(values: list[float], end: str = "2025-06-01") -> tuple[list[str], list[float]]:
+    dates = pd.date_range(end=end, periods=len(values), freq="MS")
+    return dates.strftime("%Y-%m-%d").tolist(), values
+
+
+def test_summarize_series_monthly_changes():
+    dates, values = monthly([100.0] * 48 + [100.0 + i for i in range(13)])
+    summary = summarize_series(dates, values)
+    assert summary["as_of"] == "2025-06-01"
+    assert summary["latest"] == 112.0
+    assert summary["chg_1y_pct"] == 12.0       # vs 2024-06-01
+    assert summary["chg_5y_pct"] == 12.0       # vs 2020-06-01
+    assert summary["trend_6m"] == "rising"
+
+
+def test_summarize_series_uses_calendar_months_for_daily_data():
+    dates = pd.bdate_range("2023-06-01", "2025-06-02")
+    values = [200.0 if d == pd.Timestamp("2024-06-03") else 100.0 for d in dates]
+    summary = summarize_series(dates.strftime("%Y-%m-%d").tolist(), values)
+    # nearest business day to 2024-06-02 is the 2024-06-03 observation
+    assert summary["chg_1y_pct"] == -50.0
+    assert summary["chg_5y_pct"] is None
+    assert summary["trend_6m"] == "flat"
+
+
+def test_summarize_series_quarterly_finds_year_ago():
+    dates = ["2023-01-01", "2023-04-01", "2023-07-01", "2023-10-01", "2024-01-01"]
+    summary = summarize_series(dates, [10.0, 11.0, 12.0, 13.0, 8.0])
+    assert summary["chg_1y_pct"] == -20.0
+    assert summary["trend_6m"] == "falling"
+
+
+def test_summarize_series_skips_missing_values():
+    assert summarize_series(["2024-01-01", "2024-02-01"], [None, None]) is None
+    summary = summarize_series(["2024-01-01", "2024-02-01"], [1.0, None])
+    assert summary["as_of"] == "2024-01-01"
+    assert summary["chg_1y_pct"] is None
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.integrations.portfolio_analytics import compute_analytics, holdings_hash
+
+DAYS = pd.bdate_range("2024-01-01", "2025-01-01")
+
+
+def market(seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100 * np.cumprod(1 + rng.normal(0, 0.01, len(DAYS)))
+
+
+def test_long_only_matches_value_return():
+    mkt = market()
+    closes = pd.DataFrame({"A": mkt, "B": market(2) * 3}, index=DAYS)
+    shares = pd.Series({"A": 10.0, "B": 4.0})
+
+    result = compute_analytics(shares, closes, pd.Series(mkt, index=DAYS), "1y")
+    values = closes[closes.index >= DAYS[-1] - pd.Timedelta(days=365)] @ shares
+    assert result.total_return == pytest.approx(values.iloc[-1] / values.iloc[0] - 1, abs=1e-6)
+    assert sum(a.weight for a in result.assets) == pytest.approx(1.0, abs=1e-5)
+    assert next(a for a in result.assets if a.symbol == "A").beta == pytest.approx(1.0, abs=1e-6)
+    assert result.correlation.symbols == ["A", "B"]
+    assert result.returns.cumulative_return[0] == 0.0
+    assert result.max_drawdown <= 0 and result.var_99 >= result.var_95
+
+
+def test_hedged_book_has_no_market_risk():
+    mkt = market()
+    closes = pd.DataFrame({"LONG": mkt, "SHORT": mkt * 2}, index=DAYS)
+    shares = pd.Series({"LONG": 20.0, "SHORT": -10.0, "FLAT": 0.0})
+
+    result = compute_analytics(shares, closes, pd.Series(mkt, index=DAYS), "1y")
+    assert result.total_return == pytest.approx(0.0, abs=1e-9)
+    assert result.volatility == pytest.approx(0.0, abs=1e-9)
+    assert result.beta == pytest.approx(0.0, abs=1e-6)
+    assert {a.symbol: a.weight for a in result.assets} == {"LONG": 0.5, "SHORT": -0.5}
+    assert result.missing == ["FLAT"]
+
+
+def test_short_position_gains_when_price_falls():
+    falling = np.linspace(100, 50, len(DAYS))
+    closes = pd.DataFrame({"X": falling}, index=DAYS)
+    result = compute_analytics(pd.Series({"X": -1.0}), closes, None, "1y")
+    assert result.total_return > 0
+    assert result.beta is None
+
+
+def test_unadjusted_split_is_rescaled():
+    mkt = market()
+    raw = mkt.copy()
+    raw[150:] /= 4  # 4:1 split the store has not been rebased for
+    closes = pd.DataFrame({"A": raw, "B": mkt}, index=DAYS)
+    splits = pd.DataFrame(0.0, index=DAYS, columns=["A", "B"])
+    splits.iloc[150, 0] = 4.0
+    shares = pd.Series({"A": 1.0, "B": 1.0})
+
+    result = compute_analytics(shares, closes, None, "1y", splits)
+    clean = compute_analytics(shares, closes.assign(A=mkt), None, "1y", splits)
+    assert result.split_adjusted == ["A"]
+    assert clean.split_adjusted == []
+    assert result.max_drawdown == pytest.approx(clean.max_drawdown)
+    assert result.var_99 == pytest.approx(clean.var_99)
+
+
+@pytest.mark.parametrize("ratio", [1.05, 1.1, 1 / 1.1])
+def test_stock_dividend_ratio_leaves_clean_history_alone(ratio):
+    mkt = market()
+    closes = pd.DataFrame({"A": mkt}, index=DAYS)
+    splits = pd.DataFrame(0.0, index=DAYS, columns=["A"])
+    splits.iloc[150, 0] = ratio
+
+    result = compute_analytics(pd.Series({"A": 1.0}), closes, None, "1y", splits)
+    assert result.split_adjusted == []
+    assert result.max_drawdown == pytest.approx(compute_analytics(pd.Series({"A": 1.0}), closes, None, "1y").max_drawdown)
+
+
+def test_real_crash_on_split_day_is_not_rescaled():
+    prices = np.full(len(DAYS), 100.0)
+    prices[150:] = 80.0  # a -20% day on already adjusted history with a 2:1 split
+    closes = pd.DataFrame({"A": prices}, index=DAYS)
+    splits = pd.DataFrame(0.0, index=DAYS, columns=["A"])
+    splits.iloc[150, 0] = 2.0
+    assert compute_analytics(pd.Series({"A": 1.0}), closes, None, "1y", splits).split_adjusted == []
+
+
+def test_sparse_symbols_are_reported_missing():
+    mkt = market()
+    sparse = pd.Series(mkt, index=DAYS).where(np.arange(len(DAYS)) % 2 == 0)
+    closes = pd.DataFrame({"A": mkt, "SPARSE": sparse}, index=DAYS)
+    result = compute_analytics(pd.Series({"A": 1.0, "SPARSE": 1.0, "NOHIST": 1.0}), closes, None, "1y")
+    assert result.missing == ["SPARSE", "NOHIST"]
+    assert [a.symbol for a in result.assets] == ["A"]
+
+
+def test_too_little_history_raises():
+    closes = pd.DataFrame({"A": np.arange(1.0, 11.0)}, index=DAYS[:10])
+    with pytest.raises(ValueError):
+        compute_analytics(pd.Series({"A": 1.0}), closes, None, "1y")
+    with pytest.raises(ValueError):
+        compute_analytics(pd.Series({"A": 1.0}), pd.DataFrame(), None, "1y")
+
+
+def test_holdings_hash_ignores_order():
+    assert holdings_hash(pd.Series({"A": 1.0, "B": 2.0})) == holdings_hash(pd.Series({"B": 2.0, "A": 1.0}))
+    assert holdings_hash(pd.Series({"A": 1.0})) != holdings_hash(pd.Series({"A": -1.0}))